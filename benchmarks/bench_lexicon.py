@@ -0,0 +1,58 @@
+"""Compare the old set-based word loading with the compiled, memory-mapped lexicon.
+
+    python benchmarks/bench_lexicon.py
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.game.lexicon import Lexicon, compile_lexicon, compiled_path
+
+SOURCE = "english-words.txt"
+LOOKUPS = 100_000
+
+
+def load_set(filename):
+    with open(filename, "r") as file:
+        return {line.strip().lower() for line in file.readlines()}
+
+
+def measure(label, load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    words = load()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} load {elapsed * 1000:8.1f} ms   peak alloc {peak / 1e6:7.1f} MB")
+    return words
+
+
+def lookups(label, words, probes):
+    start = time.perf_counter()
+    hits = sum(1 for word in probes if word in words)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {len(probes)} lookups {elapsed * 1000:8.1f} ms   ({hits} hits)")
+
+
+def main():
+    start = time.perf_counter()
+    compile_lexicon(SOURCE)
+    print(f"compile                {(time.perf_counter() - start) * 1000:8.1f} ms (one-off build step)")
+
+    baseline = measure("set (readlines)", lambda: load_set(SOURCE))
+    lexicon = measure("mmap lexicon", lambda: Lexicon(SOURCE, compiled_path(SOURCE)))
+
+    sample = random.sample(sorted(baseline), LOOKUPS // 2)
+    probes = sample + [word + "zq" for word in sample]
+    random.shuffle(probes)
+    lookups("set (readlines)", baseline, probes)
+    lookups("mmap lexicon", lexicon, probes)
+
+
+if __name__ == "__main__":
+    main()
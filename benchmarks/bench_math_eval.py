@@ -0,0 +1,150 @@
+"""Benchmark MathGame answer checking and fuzz it against the old eval-based checker.
+
+    python benchmarks/bench_math_eval.py [--fuzz N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.game.math_expr import ExpressionError, compile_expression
+from src.game.mathgame import MathGame
+
+
+def legacy_verify(numbers, goal, user_input):
+    """The eval-based check MathGame used before the compiled evaluator, reduced to its verdict."""
+    input_numbers = [int(num) for num in re.findall(r'\d+', user_input)]
+    if sorted(input_numbers) != sorted(numbers):
+        return "numbers"
+    if not re.fullmatch(r'^[\d+\-*/(). $]+$', user_input):
+        return "characters"
+    try:
+        result = eval(user_input)
+        if isinstance(result, float):
+            if not result.is_integer():
+                return "fraction"
+            result = int(result)
+        return "correct" if result == goal else ("incorrect", result)
+    except ZeroDivisionError:
+        return "zero"
+    except:
+        return "invalid"
+
+
+def verdict(game, user_input):
+    success, message = game._verify_solution(user_input)
+    if success:
+        return "correct"
+    if message.startswith("You must use"):
+        return "numbers"
+    if message.startswith("Only numbers"):
+        return "characters"
+    if message.startswith("Result must"):
+        return "fraction"
+    if "Division by zero" in message:
+        return "zero"
+    if message.startswith("❌ Incorrect"):
+        return "incorrect", int(message.split("equals ")[1].split(",")[0])
+    return "invalid"
+
+
+def normalize(outcome):
+    # Both checkers reject malformed input, but may pick different messages for it.
+    return "rejected" if outcome in ("numbers", "characters", "invalid") else outcome
+
+
+def random_expression(numbers, depth=0):
+    if len(numbers) == 1 or depth > 3:
+        text = str(numbers[0]) if len(numbers) == 1 else " + ".join(map(str, numbers))
+    else:
+        split = random.randint(1, len(numbers) - 1)
+        left = random_expression(numbers[:split], depth + 1)
+        right = random_expression(numbers[split:], depth + 1)
+        text = f"{left} {random.choice('+-*/')} {right}"
+    if random.random() < 0.4:
+        text = f"({text})"
+    if random.random() < 0.05:
+        text = "-" + text
+    return text
+
+
+def mutate(text):
+    roll = random.random()
+    position = random.randrange(len(text) + 1)
+    if roll < 0.1:
+        return text[:position] + random.choice("()+-*/ 0123456789.$x") + text[position:]
+    if roll < 0.2 and text:
+        return text[:position] + text[position + 1:]
+    return text
+
+
+def fuzz(rounds):
+    game = MathGame()
+    mismatches = 0
+    for _ in range(rounds):
+        game._generate_data()
+        text = mutate(random_expression(game.current_numbers[:]))
+        old = normalize(legacy_verify(game.current_numbers, game.goal, text))
+        new = normalize(verdict(game, text))
+        if old == new:
+            continue
+        # Accepted differences: float rounding in the old checker (7/3*3 != 7.0), inputs it
+        # passed straight to eval ("**", "//", ".", "$"), and leading zeros, which eval rejects
+        # although its own number check read "013" as 13.
+        if old == "fraction" or re.search(r"\*\*|//|\.|\$|(?<![0-9])0[0-9]", text):
+            continue
+        mismatches += 1
+        print(f"mismatch: {text!r} numbers={game.current_numbers} goal={game.goal}: old={old} new={new}")
+    print(f"fuzz: {rounds} inputs, {mismatches} unexpected mismatches")
+    return mismatches
+
+
+def bench():
+    game = MathGame()
+    game._generate_data()
+    inputs = [random_expression(game.current_numbers[:]) for _ in range(20_000)]
+
+    start = time.perf_counter()
+    for text in inputs:
+        legacy_verify(game.current_numbers, game.goal, text)
+    old = time.perf_counter() - start
+
+    compile_expression.cache_clear()
+    start = time.perf_counter()
+    for text in inputs:
+        game._verify_solution(text)
+    new = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in inputs:
+        game._verify_solution(text)
+    cached = time.perf_counter() - start
+
+    print(f"eval check       {len(inputs) / old:10,.0f} /s")
+    print(f"compiled check   {len(inputs) / new:10,.0f} /s")
+    print(f"  cached parse   {len(inputs) / cached:10,.0f} /s")
+
+    for text in ("9**9**9", "(" * 50 + "1" + ")" * 50, "1+" * 100 + "1", "123456789"):
+        start = time.perf_counter()
+        try:
+            compile_expression(text)
+            outcome = "accepted"
+        except ExpressionError as e:
+            outcome = str(e)
+        print(f"hostile {text[:20]!r:<24} {outcome} in {(time.perf_counter() - start) * 1e6:.0f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fuzz", type=int, default=20_000)
+    args = parser.parse_args()
+    bench()
+    sys.exit(1 if fuzz(args.fuzz) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Checks that the send limiter merges texts to one chat and does not starve announcements.
+
+Users start every game through main.py's ``game_choice`` against the in-process Bot API
+stand-in, and each game start must reach the chat as a single sendMessage carrying both
+the "Type /stop" notice and the game's first message. Then interactive replies are sent
+faster than the global bucket allows, with an announcement now and then; announcements
+must not wait more than ``PRIORITY_SECONDS`` longer than the slowest reply. Exits with
+status 1 if either check fails.
+
+    python benchmarks/bench_send_limiter.py [--users 120] [--overload 1.5] [--duration 6]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import random
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Update
+
+from fake_telegram import FAKE_TOKEN, FakeTelegram, callback_update
+from main import DIFFICULTY_CHOICES, GAME_CHOICES, build_application, load_game_data
+from src.bot.rate_limiter import ANNOUNCEMENT, INTERACTIVE, NOTICE_HOLD_SECONDS, PRIORITY_SECONDS, SendLimiter
+
+UNLIMITED = 1e9
+STOP_NOTICE = "Type /stop to end your current game."
+# Memory Game draws its grid by editing the menu message, so the notice is its only sendMessage.
+EDITS_MENU = {"play_memorygame"}
+
+
+async def dispatch(application, data):
+    update = Update.de_json(data, application.bot)
+    await application.update_processor.process_update(update, application.process_update(update))
+
+
+async def settle(limiter):
+    """Wait until nothing is queued or held back in ``limiter``."""
+    while True:
+        await asyncio.sleep(NOTICE_HOLD_SECONDS * 2)
+        stats = limiter.stats()
+        if not stats["queue_depth"] and not stats["overall_waiting"]:
+            return
+
+
+def game_choice(user):
+    return list(GAME_CHOICES)[user % len(GAME_CHOICES)]
+
+
+def sent_as_one(choice, texts):
+    if len(texts) != 1 or not texts[0].startswith(STOP_NOTICE):
+        return False
+    return choice in EDITS_MENU or texts[0] != STOP_NOTICE
+
+
+async def check_game_starts(users):
+    """Start a game for each user; returns the texts each chat received."""
+    fake = FakeTelegram(record=True)
+    # One message per second per chat, so a second text to a chat has to wait for its turn.
+    limiter = SendLimiter(UNLIMITED, UNLIMITED, chat_rate=1, chat_burst=1)
+    with tempfile.TemporaryDirectory() as directory:
+        application = build_application(
+            FAKE_TOKEN, request=fake, get_updates_request=fake, rate_limiter=limiter,
+            session_db=os.path.join(directory, "sessions.db")
+        )
+        async with application:
+            await application.post_init(application)
+            await application.start()
+            updates = []
+            for user in range(users):
+                choice = game_choice(user)
+                if choice in DIFFICULTY_CHOICES:
+                    choice = f"{choice}:{DIFFICULTY_CHOICES[choice][0]}"
+                updates.append(callback_update(user + 1, 1000 + user, choice))
+            await asyncio.gather(*(dispatch(application, update) for update in updates))
+            await settle(limiter)
+            stats = limiter.stats()
+            await application.stop()
+        await application.post_shutdown(application)
+
+    received = defaultdict(list)
+    for chat_id, text in fake.sent:
+        received[chat_id].append(text)
+    return received, stats
+
+
+async def check_announcements(overload, duration, rate=100):
+    """Send replies at ``overload`` times the global rate, plus an announcement every 0.2s.
+
+    Returns the longest wait of each kind of request.
+    """
+    limiter = SendLimiter(rate, 1, UNLIMITED, UNLIMITED, UNLIMITED, UNLIMITED)
+    waits = {INTERACTIVE: [], ANNOUNCEMENT: []}
+
+    async def callback():
+        return True
+
+    async def send(chat_id, priority):
+        start = time.perf_counter()
+        data = {"chat_id": chat_id, "text": "..."}
+        await limiter.process_request(callback, (), {}, "sendMessage", data, {"priority": priority})
+        waits[priority].append(time.perf_counter() - start)
+
+    rng = random.Random(1)
+    sends = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for _ in range(int(rate * overload / 50)):
+            sends.append(asyncio.create_task(send(rng.randrange(10_000), INTERACTIVE)))
+        if len(sends) % 10 == 0:
+            sends.append(asyncio.create_task(send(rng.randrange(10_000, 20_000), ANNOUNCEMENT)))
+        await asyncio.sleep(0.02)
+    await asyncio.gather(*sends)
+    await limiter.shutdown()
+    return max(waits[INTERACTIVE]), max(waits[ANNOUNCEMENT])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=120)
+    parser.add_argument("--overload", type=float, default=1.5, help="replies sent per reply the global bucket allows")
+    parser.add_argument("--duration", type=float, default=6.0, help="seconds of overload")
+    args = parser.parse_args()
+
+    load_game_data()
+    start = time.perf_counter()
+    received, stats = asyncio.run(check_game_starts(args.users))
+    split = [1000 + user for user in range(args.users) if not sent_as_one(game_choice(user), received[1000 + user])]
+    print(
+        f"game starts: {args.users} in {time.perf_counter() - start:.1f}s, "
+        f"{sum(map(len, received.values()))} messages sent, {stats['merged']} texts merged, "
+        f"{len(split)} not sent as one message"
+    )
+    for chat_id in split[:5]:
+        print(f"  chat {chat_id}: {received[chat_id]!r}")
+
+    interactive, announcement = asyncio.run(check_announcements(args.overload, args.duration))
+    starved = announcement > interactive + PRIORITY_SECONDS + 0.5
+    print(
+        f"under {args.overload}x load: slowest reply {interactive:.1f}s, slowest announcement {announcement:.1f}s"
+        + (" (starved)" if starved else "")
+    )
+    sys.exit(1 if split or starved else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Bytes per active session for each game, measured with tracemalloc at 10k and 100k sessions.
+
+Each session is what a user keeps in user_data mid-game: a GameBot and its current game,
+a few moves in. Shared word lists and indexes are loaded first and not counted.
+
+    python benchmarks/bench_session_memory.py [--sessions 10000 100000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import load_game_data
+from src.bot.gamebot import GameBot
+from src.game.lexicon import get_lexicon
+from src.game.memory import MemoryGame, get_template
+
+
+def wordle_record(rng):
+    answers = get_lexicon("word-list.json")
+    guesses = [answers[rng.randrange(len(answers))] for _ in range(3)]
+    return {"game": "Wordle", "state": {"target": answers[rng.randrange(len(answers))], "attempts": 3, "guesses": guesses, "hard": True}}
+
+
+def wordchain_record(rng):
+    words = get_lexicon("english-words.txt")
+    used = sorted({words[rng.randrange(len(words))] for _ in range(12)})
+    return {"game": "WordChain", "state": {"difficulty": "medium", "current": used[-1], "used": used}}
+
+
+def hangman_record(rng):
+    words = get_lexicon("common-words.txt")
+    return {"game": "Hangman", "state": {"word": words[rng.randrange(len(words))], "difficulty": "medium", "guessed": "aes", "wrong": "qz", "remaining": 4}}
+
+
+def unscramble_record(rng):
+    words = get_lexicon("common-words.txt")
+    word = words[rng.randrange(len(words))]
+    return {"game": "Unscramble", "state": {"word": word, "scrambled": "".join(rng.sample(word, len(word)))}}
+
+
+def math_record(rng):
+    return {"game": "MathGame", "state": {"difficulty": "medium", "goal": 24, "numbers": [rng.randint(1, 15) for _ in range(4)], "solution": "(1 + 2) * 8 * 1"}}
+
+
+def restored_session(make_record):
+    def make(rng):
+        gamebot = GameBot()
+        game = gamebot.restore(make_record(rng))
+        return {"gamebot": gamebot, "current_game": game}
+    return make
+
+
+def memory_session(rng):
+    gamebot = GameBot()
+    game = gamebot.games["Memory"] = gamebot.current_game = MemoryGame()
+    game.grid_size = 5
+    cells = rng.sample(range(25), 7)
+    for cell in cells:
+        game.red_mask |= 1 << cell
+    template = get_template(5)
+    game.rows = list(template.blank_rows)
+    for cell in cells[:3]:
+        game.click_mask |= 1 << cell
+        row = list(game.rows[cell // 5])
+        row[cell % 5] = template.hit[cell]
+        game.rows[cell // 5] = tuple(row)
+    return {"gamebot": gamebot, "current_game": game}
+
+
+GAMES = {
+    "Wordle": restored_session(wordle_record),
+    "WordChain": restored_session(wordchain_record),
+    "Hangman": restored_session(hangman_record),
+    "Unscramble": restored_session(unscramble_record),
+    "MathGame": restored_session(math_record),
+    "Memory": memory_session,
+}
+
+
+def bytes_per_session(make, count):
+    rng = random.Random(1)
+    make(rng)  # warm up lazily built shared data
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [make(rng) for _ in range(count)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del sessions
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--games", nargs="+", default=list(GAMES), choices=list(GAMES))
+    args = parser.parse_args()
+
+    load_game_data()
+    print(f"{'game':<12}" + "".join(f"{count:>15,} sessions" for count in args.sessions))
+    for name in args.games:
+        row = [bytes_per_session(GAMES[name], count) for count in args.sessions]
+        print(f"{name:<12}" + "".join(f"{value:>15,.0f} B/session" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""Micro-benchmarks for the functions each game runs on every move, saved as JSON for comparison.
+
+Every case is timed in a loop long enough to take ``--min-time`` seconds, ``--repeat``
+times; the median and best time per call are reported. ``--output`` saves the results
+with the Python version and git commit; ``--compare`` reads a saved run and flags every
+case more than ``--threshold`` slower, exiting with status 1 if there is any.
+
+    python benchmarks/bench_suite.py [--output run.json] [--compare baseline.json] [--filter wordle]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import InlineKeyboardMarkup
+
+from main import load_game_data
+from src.bot.gamebot import GameBot
+from src.game.hangman import HangmanGame, letter_bit
+from src.game.lexicon import Lexicon, compiled_path, get_lexicon
+from src.game.mathgame import MODES as MATH_MODES, MathGame
+from src.game.memory import MemoryGame, get_template
+from src.game.unscramble_word import UnscrambleGame
+from src.game.wordchain import WordChainGame
+from src.game.wordle import WordleGame
+
+SAMPLES = 1024
+# WordChain games are restarted after this many bot words, as real games are short.
+WORDCHAIN_GAME_LENGTH = 200
+
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def cycle(values):
+    """Return a function giving the next of ``values`` on each call, round and round."""
+    state = {"i": 0}
+
+    def next_value():
+        i = state["i"]
+        state["i"] = (i + 1) % len(values)
+        return values[i]
+    return next_value
+
+
+def run_sync(coroutine):
+    """Run a coroutine that never actually suspends (every await below it returns at once)."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("benchmarked coroutine suspended")
+
+
+@case("gamebot.load_words")
+def bench_load_words(rng):
+    gamebot = GameBot()
+    return lambda: gamebot.load_words("english-words.txt")
+
+
+@case("lexicon.open_cold")
+def bench_lexicon_open(rng):
+    path = compiled_path("english-words.txt")
+    return lambda: Lexicon("english-words.txt", path)
+
+
+@case("wordle.get_feedback")
+def bench_wordle_feedback(rng):
+    answers = get_lexicon("word-list.json")
+    game = WordleGame()
+    pairs = cycle([(answers[rng.randrange(len(answers))], answers[rng.randrange(len(answers))]) for _ in range(SAMPLES)])
+
+    def run():
+        game.target_word, guess = pairs()
+        return game.get_feedback(guess)
+    return run
+
+
+@case("wordle.valid_word")
+def bench_wordle_valid(rng):
+    valid = get_lexicon("valid-words.json")
+    game = WordleGame()
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    # Half real words, half random five-letter strings.
+    guesses = cycle([
+        valid[rng.randrange(len(valid))] if i % 2 else "".join(rng.choice(letters) for _ in range(5))
+        for i in range(SAMPLES)
+    ])
+    return lambda: guesses() in game.valid_words
+
+
+def bench_wordchain(rng, difficulty):
+    words = get_lexicon("english-words.txt")
+    letters = cycle([rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(SAMPLES)])
+    state = {"game": None, "moves": 0}
+
+    def run():
+        if state["moves"] == 0:
+            game = state["game"] = WordChainGame(words, difficulty)
+            game._reset_counts()
+            state["moves"] = WORDCHAIN_GAME_LENGTH
+        state["moves"] -= 1
+        game = state["game"]
+        word = game.find_bot_word(letters())
+        if word is not None:
+            game._use_word(word)
+        return word
+    return run
+
+
+for _difficulty in ("easy", "medium", "hard"):
+    case(f"wordchain.find_bot_word.{_difficulty}")(lambda rng, difficulty=_difficulty: bench_wordchain(rng, difficulty))
+
+
+@case("hangman.display_word")
+def bench_hangman_display(rng):
+    words = get_lexicon("common-words.txt")
+    games = []
+    for _ in range(SAMPLES):
+        game = HangmanGame(words)
+        game.secret_word = words[rng.randrange(len(words))]
+        for letter in rng.sample(sorted(set(game.secret_word)), len(set(game.secret_word)) // 2):
+            game.guessed_mask |= letter_bit(letter)
+        games.append(game)
+    games = cycle(games)
+    return lambda: games()._get_display_word()
+
+
+@case("unscramble.pick_word")
+def bench_unscramble_pick(rng):
+    game = UnscrambleGame(get_lexicon("common-words.txt"))
+    return game.pick_word
+
+
+def bench_math_generate(rng, difficulty):
+    game = MathGame(difficulty)
+    return game._generate_data
+
+
+for _mode in MATH_MODES:
+    case(f"mathgame.generate_data.{_mode.replace(' ', '_')}")(lambda rng, mode=_mode: bench_math_generate(rng, mode))
+
+
+@case("mathgame.verify_solution")
+def bench_math_verify(rng):
+    puzzles = []
+    for difficulty in ("easy", "medium", "hard"):
+        for _ in range(SAMPLES // 6):
+            game = MathGame(difficulty)
+            game._generate_data()
+            game.current_numbers = tuple(game.current_numbers)
+            # One right answer and one using the numbers the wrong way.
+            puzzles.append((game, game.computer_solution))
+            puzzles.append((game, " + ".join(map(str, game.current_numbers))))
+    puzzles = cycle(puzzles)
+
+    def run():
+        game, answer = puzzles()
+        return game._verify_solution(answer)
+    return run
+
+
+class _Query:
+    def __init__(self, data):
+        self.data = data
+
+    async def answer(self):
+        pass
+
+
+class _Update:
+    def __init__(self, data):
+        self.callback_query = _Query(data)
+
+
+class _Application:
+    def create_task(self, coroutine, update=None):
+        coroutine.close()
+
+
+class _Context:
+    application = _Application()
+    user_data = {}
+
+
+@case("memory.handle_click")
+def bench_memory_click(rng):
+    size = 5
+    game = MemoryGame()
+    game.grid_size = size
+    cells = rng.sample(range(size * size), 8)
+    for cell in cells:
+        game.red_mask |= 1 << cell
+    template = get_template(size)
+    # Click every red cell but the last, so the round never ends, then start over.
+    clicks = cycle([_Update(f"{cell // size},{cell % size}") for cell in cells[:-1]])
+    context = _Context()
+
+    def run():
+        update = clicks()
+        if game.click_mask.bit_count() == len(cells) - 1:
+            game.click_mask = 0
+            game.rows = list(template.blank_rows)
+        run_sync(game.handle_click(update, context))
+    game.rows = list(template.blank_rows)
+    return run
+
+
+@case("memory.render_markup")
+def bench_memory_markup(rng):
+    size = 5
+    template = get_template(size)
+    rows = list(template.blank_rows)
+    for cell in rng.sample(range(size * size), 6):
+        row = list(rows[cell // size])
+        row[cell % size] = template.hit[cell]
+        rows[cell // size] = tuple(row)
+    return lambda: InlineKeyboardMarkup(rows).to_dict()
+
+
+def measure(run, min_time, repeat):
+    """Return nanoseconds per call for each of ``repeat`` timed loops, and the loop length."""
+    loops = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9 / 10:
+            break
+        loops *= 2
+    loops = max(1, int(loops * min_time * 1e9 / max(elapsed, 1)))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            run()
+        timings.append((time.perf_counter_ns() - start) / loops)
+    return timings, loops
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ns(ns):
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+def compare(results, baseline, threshold):
+    """Print each case's change against ``baseline``; return the names that got slower."""
+    slower = []
+    print(f"\n{'case':<40}{'baseline':>12}{'now':>12}{'change':>9}")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["median_ns"] / before["median_ns"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            slower.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:<40}{format_ns(before['median_ns']):>12}{format_ns(result['median_ns']):>12}{ratio - 1:>+9.1%}{flag}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed loop")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    load_game_data()
+    results = {}
+    print(f"{'case':<40}{'median':>12}{'best':>12}{'loops':>10}")
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        random.seed(args.seed)
+        run = setup(random.Random(args.seed))
+        timings, loops = measure(run, args.min_time, args.repeat)
+        results[name] = {"median_ns": statistics.median(timings), "best_ns": min(timings), "loops": loops, "timings_ns": timings}
+        print(f"{name:<40}{format_ns(results[name]['median_ns']):>12}{format_ns(min(timings)):>12}{loops:>10}")
+
+    if args.output:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "min_time": args.min_time,
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nSaved {len(results)} results to {args.output}")
+
+    if baseline is not None:
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print(f"\n{len(slower)} case(s) more than {args.threshold:.0%} slower: {', '.join(slower)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Updates per second and reply latency for webhook vs long-polling intake.
+
+Both modes run the real application from main.py against the in-process Bot API
+stand-in, with the rate limiter opened up so only update intake and dispatch are
+measured. Each update is a /start or a text message, answered with one reply.
+
+    python benchmarks/bench_webhook.py [--updates 20000] [--users 500] [--latency 0.02]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_telegram import FAKE_TOKEN, FakeTelegram, message_update, post_updates
+from main import build_application
+from src.bot.rate_limiter import SendLimiter
+from src.bot.webhook import WebhookServer
+
+UNLIMITED = 1e9
+
+
+def make_updates(count, users):
+    return [
+        message_update(i + 1, 100 + i % users, "/start" if i % 2 else "hello")
+        for i in range(count)
+    ]
+
+
+class ReplyTracker:
+    """Matches each reply to the oldest unanswered update of its chat."""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.sent_at = defaultdict(deque)
+        self.latencies = []
+        self.done = asyncio.Event()
+
+    def sent(self, update):
+        self.sent_at[update["message"]["chat"]["id"]].append(time.perf_counter())
+
+    def on_send(self, chat_id, text):
+        self.latencies.append(time.perf_counter() - self.sent_at[chat_id].popleft())
+        if len(self.latencies) >= self.expected:
+            self.done.set()
+
+
+def build(fake):
+    limiter = SendLimiter(UNLIMITED, UNLIMITED, UNLIMITED, UNLIMITED, UNLIMITED, UNLIMITED)
+    return build_application(FAKE_TOKEN, request=fake, get_updates_request=fake, rate_limiter=limiter)
+
+
+async def run_polling(updates, latency):
+    tracker = ReplyTracker(len(updates))
+    fake = FakeTelegram(latency, on_send=tracker.on_send)
+    application = build(fake)
+    async with application:
+        await application.start()
+        await application.updater.start_polling(poll_interval=0, timeout=10)
+        start = time.perf_counter()
+        for update in updates:
+            tracker.sent(update)
+        fake.push(*updates)
+        await tracker.done.wait()
+        elapsed = time.perf_counter() - start
+        await application.updater.stop()
+        await application.stop()
+    return elapsed, tracker.latencies, fake.calls["getUpdates"]
+
+
+async def run_webhook(updates, latency, workers, queue_size, connections):
+    tracker = ReplyTracker(len(updates))
+    fake = FakeTelegram(latency, on_send=tracker.on_send)
+    application = build(fake)
+    async with application:
+        await application.start()
+        server = WebhookServer(application, "127.0.0.1", 0, "/hook", workers=workers, queue_size=queue_size)
+        await server.start()
+
+        start = time.perf_counter()
+        for update in updates:
+            tracker.sent(update)
+        statuses = await post_updates(server.port, "/hook", updates, connections)
+        await tracker.done.wait()
+        elapsed = time.perf_counter() - start
+        await server.stop()
+        await application.stop()
+    return elapsed, tracker.latencies, dict(statuses)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def report(name, count, elapsed, latencies, extra):
+    print(
+        f"{name:<8} {count / elapsed:>9.0f} updates/s  "
+        f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  {extra}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated Bot API round trip in seconds")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--queue-size", type=int, default=1024)
+    parser.add_argument("--connections", type=int, default=40, help="concurrent webhook connections")
+    args = parser.parse_args()
+
+    updates = make_updates(args.updates, args.users)
+    elapsed, latencies, polls = asyncio.run(run_polling(updates, args.latency))
+    report("polling", len(updates), elapsed, latencies, f"({polls} getUpdates calls)")
+    elapsed, latencies, statuses = asyncio.run(
+        run_webhook(updates, args.latency, args.workers, args.queue_size, args.connections)
+    )
+    report("webhook", len(updates), elapsed, latencies, f"(responses {statuses})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Guesses per second for Wordle validation and feedback, before and after the rewrite.
+
+    python benchmarks/bench_wordle.py [--hard-hints N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.game.wordle import WordleGame
+from src.game.wordle_solver import Constraints, get_answer_index, pattern_code
+
+ROUNDS = 50_000
+
+
+def legacy_feedback(target_word, guessed_word):
+    feedback = [""] * 5
+    target_word_copy = list(target_word)
+
+    for i, char in enumerate(guessed_word):
+        if char == target_word[i]:
+            feedback[i] = "🟩"
+            target_word_copy[i] = None
+
+    for i, char in enumerate(guessed_word):
+        if feedback[i] == "":
+            if char in target_word_copy and char != None:
+                feedback[i] = "🟨"
+                target_word_copy[target_word_copy.index(char)] = None
+
+    for i, char in enumerate(guessed_word):
+        if feedback[i] == "":
+            feedback[i] = "🟥"
+
+    return " ".join(feedback)
+
+
+def legacy_game():
+    with open("word-list.json", "r") as file:
+        target = random.choice(json.load(file)).lower()
+    with open("valid-words.json", "r") as file:
+        valid_words = json.load(file)
+    return target, valid_words
+
+
+def rate(label, count, elapsed):
+    print(f"{label:<34} {count / elapsed:12,.0f} /s")
+
+
+async def check_hard_hints(games):
+    """Play hard-mode games with random legal guesses and check that every hint is legal too."""
+    with open("valid-words.json", "r") as file:
+        pool = json.load(file)
+    hints = illegal = 0
+    for _ in range(games):
+        game = WordleGame(hard_mode=True)
+        game.constraints = Constraints(get_answer_index())
+        for _ in range(5):
+            hint = re.search(r'try "([a-z]+)"', await game.get_hint()).group(1)
+            hints += 1
+            violation = game.constraints.violation(hint)
+            if violation:
+                illegal += 1
+                print(f"illegal hint {hint!r} for {game.target_word!r} after {game.guesses}: {violation}")
+            guess = random.choice([word for word in pool if game.constraints.violation(word) is None])
+            if guess == game.target_word:
+                break
+            game.guesses.append(guess)
+            game.constraints.update(guess, pattern_code(guess, game.target_word))
+    print(f"hard-mode hints: {hints} checked in {games} games, {illegal} illegal")
+    return illegal
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hard-hints", type=int, default=40, help="hard-mode games whose hints are checked")
+    args = parser.parse_args()
+
+    with open("valid-words.json", "r") as file:
+        pool = json.load(file)
+    guesses = [random.choice(pool) for _ in range(ROUNDS)]
+
+    start = time.perf_counter()
+    for _ in range(200):
+        legacy_game()
+    rate("legacy new game", 200, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(200):
+        WordleGame()
+    rate("shared-lexicon new game", 200, time.perf_counter() - start)
+
+    target, valid_words = legacy_game()
+    start = time.perf_counter()
+    for guess in guesses:
+        if guess in valid_words:
+            legacy_feedback(target, guess)
+    rate("legacy guess (list check + feedback)", ROUNDS, time.perf_counter() - start)
+
+    game = WordleGame()
+    start = time.perf_counter()
+    for guess in guesses:
+        if guess in game.valid_words:
+            game.get_feedback(guess)
+    rate("guess (hashed check + feedback)", ROUNDS, time.perf_counter() - start)
+
+    for guess in guesses[:2000]:
+        assert game.get_feedback(guess).startswith(legacy_feedback(game.target_word, guess))
+
+    sys.exit(1 if asyncio.run(check_hard_hints(args.hard_hints)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""In-process stand-in for the Telegram Bot API, for benchmarks and local load tests.
+
+``FakeTelegram`` is a ``telegram.request.BaseRequest``: pass it as ``request`` and
+``get_updates_request`` when building the Application and every Bot API call is answered
+locally. Updates queued with ``push`` are served through getUpdates; ``post_updates``
+delivers them to a webhook server over HTTP the way Telegram does.
+"""
+import asyncio
+import json
+import time
+from collections import Counter, deque
+
+from telegram.request import BaseRequest
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "GameBot", "username": "gamebot_fake_bot"}
+FAKE_TOKEN = "1:fake"
+
+
+def message_update(update_id, user_id, text):
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": user,
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def callback_update(update_id, user_id, data, message_id=1):
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    message = {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": BOT_USER,
+        "text": "...",
+    }
+    return {
+        "update_id": update_id,
+        "callback_query": {"id": str(update_id), "from": user, "chat_instance": str(user_id), "message": message, "data": data},
+    }
+
+
+class FakeTelegram(BaseRequest):
+    """Answers Bot API calls in-process and records them.
+
+    ``latency`` adds a simulated network round trip to every call. ``calls`` counts calls
+    per endpoint; ``sent`` holds ``(chat_id, text)`` for every sendMessage when ``record``
+    is set. ``on_send(chat_id, text)`` is called for each sendMessage if given.
+    """
+
+    def __init__(self, latency=0.0, record=False, on_send=None):
+        self.latency = latency
+        self.record = record
+        self.on_send = on_send
+        self.calls = Counter()
+        self.sent = []
+        self._updates = deque()
+        self._update_ready = None
+        self._message_id = 1000
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def push(self, *updates):
+        """Queue update dicts to be returned by getUpdates."""
+        self._updates.extend(updates)
+        if self._update_ready is not None:
+            self._update_ready.set()
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if endpoint == "getUpdates":
+            result = await self._get_updates(params)
+        elif endpoint == "getMe":
+            result = BOT_USER
+        elif endpoint in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            result = self._message(endpoint, params)
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    def _message(self, endpoint, params):
+        chat_id = params.get("chat_id", 0)
+        if endpoint == "sendMessage":
+            self._message_id += 1
+            message_id = self._message_id
+            if self.record:
+                self.sent.append((chat_id, params.get("text")))
+            if self.on_send is not None:
+                self.on_send(chat_id, params.get("text"))
+        else:
+            message_id = params.get("message_id", 1)
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", "..."),
+        }
+        if params.get("reply_markup"):
+            message["reply_markup"] = params["reply_markup"]
+        return message
+
+    async def _get_updates(self, params):
+        offset = params.get("offset") or 0
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates and params.get("timeout"):
+            self._update_ready = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._update_ready.wait(), params["timeout"])
+            except asyncio.TimeoutError:
+                pass
+            self._update_ready = None
+        limit = params.get("limit") or 100
+        return [self._updates[i] for i in range(min(limit, len(self._updates)))]
+
+
+async def post_updates(port, path, updates, connections=8, secret_token=None, host="127.0.0.1"):
+    """POST ``updates`` to a webhook server over keep-alive connections, one request in flight each.
+
+    Deliveries answered with 503 are retried, as Telegram does. Returns the response statuses.
+    """
+    statuses = Counter()
+    queue = deque(updates)
+    secret = f"X-Telegram-Bot-Api-Secret-Token: {secret_token}\r\n" if secret_token else ""
+
+    async def connection():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                body = json.dumps(queue.popleft()).encode()
+                while True:
+                    writer.write(
+                        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                        f"{secret}Content-Length: {len(body)}\r\n\r\n".encode() + body
+                    )
+                    await writer.drain()
+                    status = int((await reader.readline()).split()[1])
+                    while (await reader.readline()) not in (b"\r\n", b""):
+                        pass
+                    statuses[status] += 1
+                    if status != 503:
+                        break
+                    await asyncio.sleep(0.01)
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(connection() for _ in range(connections)))
+    return statuses
@@ -0,0 +1,275 @@
+"""Offline load test: thousands of simulated users playing every game through main.py's handlers.
+
+Each simulated user loops over game sessions: /play, pick a game (and a difficulty), make
+moves until the game ends or ``--moves`` is reached, then /stop. Updates are built as
+Telegram would send them and dispatched through the application's update processor, so
+``restore_session``, ``game_choice``, ``guess``, ``handle_callback``, ``stop`` and
+``save_session`` all run. Bot API calls are answered by ``FakeTelegram``.
+
+Players read their own game's state to pick moves (a right one with probability
+``--accuracy``), so games run their full course instead of ending on the first mistake.
+Handler latency is measured from dispatch until every handler for the update is done,
+including any wait for a free processing slot.
+
+    python benchmarks/load_test.py [--users 2000] [--duration 30] [--rate 0.5]
+        [--mix wordle=3,wordchain=2,hangman=2,unscramble=1,memorygame=1,mathgame=1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Update
+
+from fake_telegram import FAKE_TOKEN, FakeTelegram, callback_update, message_update
+from main import DIFFICULTY_CHOICES, GAME_CHOICES, build_application, load_game_data
+from src.bot.rate_limiter import SendLimiter
+from src.game.hangman import letter_bit
+from src.game.lexicon import get_lexicon
+
+UNLIMITED = 1e9
+GAMES = [choice.removeprefix("play_") for choice in GAME_CHOICES]
+DEFAULT_MIX = "wordle=3,wordchain=2,hangman=2,unscramble=1,memorygame=1,mathgame=1"
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+# Longest a Memory Game player waits for the pattern to be hidden before giving up.
+PATTERN_TIMEOUT = 15.0
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in GAMES:
+            raise argparse.ArgumentTypeError(f"unknown game {name!r}, expected one of {', '.join(GAMES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Recorder:
+    """Handler latencies per game and per handler, and session outcomes."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.handlers = defaultdict(list)
+        self.sessions = Counter()
+        self.finished = Counter()
+        self.errors = 0
+
+    def add(self, game, handler, seconds):
+        self.latencies[game].append(seconds)
+        self.handlers[handler].append(seconds)
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.games = list(args.mix)
+        self.weights = list(args.mix.values())
+        self.recorder = Recorder()
+        self.next_update_id = 0
+        self.answers = get_lexicon("word-list.json")
+        self.words = get_lexicon("english-words.txt")
+        self.application = None
+        self.deadline = 0.0
+
+    def update_id(self):
+        self.next_update_id += 1
+        return self.next_update_id
+
+    async def send(self, game, handler, data):
+        application = self.application
+        update = Update.de_json(data, application.bot)
+        start = time.perf_counter()
+        await application.update_processor.process_update(update, application.process_update(update))
+        self.recorder.add(game, handler, time.perf_counter() - start)
+
+    async def message(self, user_id, game, text):
+        handler = "guess"
+        if text.startswith("/"):
+            handler = text[1:]
+        await self.send(game, handler, message_update(self.update_id(), user_id, text))
+
+    async def callback(self, user_id, game, data):
+        handler = "game_choice" if data.startswith("play_") else "handle_callback"
+        await self.send(game, handler, callback_update(self.update_id(), user_id, data))
+
+    async def think(self, rng):
+        await asyncio.sleep(rng.expovariate(self.args.rate))
+
+    def current_game(self, user_id):
+        game = self.application.user_data.get(user_id, {}).get("current_game")
+        if game is None or getattr(game, "game_over", False):
+            return None
+        return game
+
+    async def run_user(self, user_id):
+        rng = random.Random(f"{self.args.seed}:{user_id}")
+        await asyncio.sleep(rng.uniform(0, self.args.ramp))
+        while time.monotonic() < self.deadline:
+            game = rng.choices(self.games, self.weights)[0]
+            await self.run_session(rng, user_id, game)
+
+    async def run_session(self, rng, user_id, game):
+        self.recorder.sessions[game] += 1
+        choice = f"play_{game}"
+        await self.message(user_id, game, "/play")
+        await self.think(rng)
+        await self.callback(user_id, game, choice)
+        if choice in DIFFICULTY_CHOICES:
+            await self.think(rng)
+            await self.callback(user_id, game, f"{choice}:{rng.choice(DIFFICULTY_CHOICES[choice])}")
+
+        for _ in range(self.args.moves):
+            if game == "memorygame":
+                # The pattern is shown for a few seconds before the grid can be clicked.
+                if not await self.wait_for_grid(user_id):
+                    break
+            await self.think(rng)
+            state = self.current_game(user_id)
+            if state is None or time.monotonic() >= self.deadline:
+                break
+            if game == "memorygame":
+                await self.callback(user_id, game, self.memory_click(rng, state))
+            else:
+                await self.message(user_id, game, self.move(rng, game, state))
+
+        if self.current_game(user_id) is None:
+            self.recorder.finished[game] += 1
+        else:
+            await self.message(user_id, game, "/stop")
+
+    async def wait_for_grid(self, user_id):
+        waited = 0.0
+        while waited < PATTERN_TIMEOUT:
+            state = self.current_game(user_id)
+            if state is None:
+                return False
+            if state.rows:
+                return True
+            await asyncio.sleep(0.1)
+            waited += 0.1
+        return False
+
+    def move(self, rng, game, state):
+        right = rng.random() < self.args.accuracy
+        if game == "wordle":
+            if right and rng.random() < 0.2:
+                return state.target_word
+            if rng.random() < 0.1:
+                return "$hint"
+            return self.answers[rng.randrange(len(self.answers))]
+        if game == "wordchain":
+            start, stop = self.words.prefix_range(state.current_word[-1] if right else rng.choice(LETTERS))
+            if start == stop:
+                return "xyzzy"
+            for _ in range(20):
+                index = rng.randrange(start, stop)
+                if index not in state.used:
+                    break
+            return self.words[index]
+        if game == "hangman":
+            if right:
+                missing = [letter for letter in sorted(set(state.secret_word)) if not state.guessed_mask & letter_bit(letter)]
+                if missing:
+                    return rng.choice(missing)
+            return rng.choice(LETTERS)
+        if game == "unscramble":
+            return state.current_word if right else state.scrambled_word
+        if game == "mathgame":
+            if rng.random() < 0.05:
+                return "$solution"
+            return state.computer_solution if right else " + ".join(map(str, state.current_numbers))
+        raise ValueError(game)
+
+    def memory_click(self, rng, state):
+        size = state.grid_size
+        right = rng.random() < self.args.accuracy
+        cells = [cell for cell in range(size * size) if not state.click_mask >> cell & 1 and (state.red_mask >> cell & 1) == right]
+        cell = rng.choice(cells or range(size * size))
+        return f"{cell // size},{cell % size}"
+
+    async def run(self):
+        args = self.args
+        fake = FakeTelegram(args.latency)
+        limiter = None if args.rate_limit else SendLimiter(UNLIMITED, UNLIMITED, UNLIMITED, UNLIMITED, UNLIMITED, UNLIMITED)
+        with tempfile.TemporaryDirectory() as directory:
+            self.application = build_application(
+                FAKE_TOKEN, request=fake, get_updates_request=fake, rate_limiter=limiter,
+                session_db=os.path.join(directory, "sessions.db")
+            )
+            self.application.add_error_handler(self.on_error)
+            async with self.application:
+                # Only run_polling and run_webhook call post_init, which opens the session store and starts the watchdog.
+                await self.application.post_init(self.application)
+                await self.application.start()
+                start = time.perf_counter()
+                self.deadline = time.monotonic() + args.duration
+                await asyncio.gather(*(self.run_user(1000 + user) for user in range(args.users)))
+                elapsed = time.perf_counter() - start
+                stats = self.application.update_processor.stats()
+                await self.application.stop()
+            await self.application.post_shutdown(self.application)
+        return elapsed, fake.calls, stats
+
+    async def on_error(self, update, context):
+        self.recorder.errors += 1
+
+
+def report(recorder, elapsed, calls, stats):
+    print(f"{'game':<12}{'sessions':>9}{'ended':>7}{'updates':>9}{'upd/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    rows = [(game, recorder.latencies[game]) for game in GAMES if recorder.latencies[game]]
+    everything = [value for _, values in rows for value in values]
+    for game, values in rows + [("all", everything)]:
+        sessions = sum(recorder.sessions.values()) if game == "all" else recorder.sessions[game]
+        finished = sum(recorder.finished.values()) if game == "all" else recorder.finished[game]
+        print(
+            f"{game:<12}{sessions:>9}{finished:>7}{len(values):>9}{len(values) / elapsed:>9.0f}"
+            f"{percentile(values, 0.5) * 1000:>9.2f}{percentile(values, 0.95) * 1000:>9.2f}{percentile(values, 0.99) * 1000:>9.2f}"
+        )
+    print()
+    print(f"{'handler':<16}{'updates':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for handler, values in sorted(recorder.handlers.items()):
+        print(
+            f"{handler:<16}{len(values):>9}{percentile(values, 0.5) * 1000:>9.2f}"
+            f"{percentile(values, 0.95) * 1000:>9.2f}{percentile(values, 0.99) * 1000:>9.2f}"
+        )
+    print()
+    print(f"{elapsed:.1f}s, {recorder.errors} handler errors, Bot API calls: {dict(calls.most_common())}")
+    print(f"update processor: peak running {stats['peak_running']}, processed {stats['processed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds before users stop starting new moves")
+    parser.add_argument("--rate", type=float, default=0.5, help="messages per second per user (think times are exponential)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which users join")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"game weights (default {DEFAULT_MIX})")
+    parser.add_argument("--moves", type=int, default=12, help="moves per game before the user types /stop")
+    parser.add_argument("--accuracy", type=float, default=0.8, help="chance that a move is a right one")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated Bot API round trip in seconds")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the real outgoing message limits")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    load_game_data()
+    test = LoadTest(args)
+    elapsed, calls, stats = asyncio.run(test.run())
+    report(test.recorder, elapsed, calls, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,67 @@
 # type: ignore
 
 import os
+import asyncio
+import logging
+from collections import Counter
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
-from src.bot.gamebot import GameBot
+from telegram.ext import Application, CommandHandler, MessageHandler, TypeHandler, filters, ContextTypes, CallbackQueryHandler
+from src.bot.gamebot import GameBot, game_label
+from src.bot.metrics import ERRORS, REGISTRY, start_metrics_server, stats_families, timed
+from src.bot.update_processor import KeyedUpdateProcessor
+from src.bot.rate_limiter import SendLimiter, send_notice
+from src.bot.webhook import serve_webhook
+from src.bot.sharding import run_sharded
+from src.bot.sessions import SessionStore
+from src.bot.watchdog import LoopWatchdog
+from src.bot.profiling import MemoryTracer, Profiler
+from src.game.lexicon import lexicon_stats, preload, get_lexicon
+from src.game.wordchain import get_transition_index, DIFFICULTIES as WORDCHAIN_DIFFICULTIES
+from src.game.wordle_solver import get_answer_index, get_guess_index, get_pattern_matrix
+from src.game.math_bank import get_puzzle_bank
+from src.game.mathgame import MODES as MATH_MODES
+from src.game.unscramble_word import get_anagram_index
+from src.game.hangman_index import get_difficulty_index, DIFFICULTIES as HANGMAN_DIFFICULTIES
 
 load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Telegram user ids allowed to use /profile and /memsnap, separated by commas.
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").replace(",", " ").split()}
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
+MAX_PENDING_UPDATES = int(os.getenv("MAX_PENDING_UPDATES", "1024"))
+# Serve updates over a webhook at this public URL instead of long polling.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "64"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1024"))
+# Serve from this many worker processes, each owning the sessions of a fixed set of users.
+SHARDS = int(os.getenv("SHARDS", "1"))
+SHARD_QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", "1024"))
+# SQLite file where in-progress games are saved so they survive restarts.
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+# Serve Prometheus metrics at http://METRICS_LISTEN:METRICS_PORT/metrics; unset to turn off.
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0) or None
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+# Log a stack sample whenever a callback holds the event loop longer than this many seconds; 0 turns it off.
+STALL_THRESHOLD = float(os.getenv("STALL_THRESHOLD") or 0.25)
 
+logger = logging.getLogger(__name__)
+
+def current_game(update, context):
+    return game_label((context.user_data or {}).get("current_game"))
+
+def chosen_game(update, context):
+    return GAME_CHOICES.get(update.callback_query.data.partition(":")[0], "none")
+
+@timed("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Welcome to GameBot! Type /play to choose a game. You can also type /stop to end your current game.")
 
+@timed("play")
 async def play(update: Update, context: ContextTypes.DEFAULT_TYPE):
     keyboard = [
         [InlineKeyboardButton("Wordle", callback_data="play_wordle")],
@@ -24,32 +74,54 @@ async def play(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text("Choose a game to play:", reply_markup=reply_markup)
 
+GAME_CHOICES = {
+    "play_wordle": "Wordle",
+    "play_wordchain": "WordChain",
+    "play_hangman": "Hangman",
+    "play_unscramble": "Unscramble Word",
+    "play_memorygame": "Memory Game",
+    "play_mathgame": "Math Game",
+}
+
+DIFFICULTY_CHOICES = {
+    "play_wordle": ["normal", "hard"],
+    "play_wordchain": WORDCHAIN_DIFFICULTIES,
+    "play_hangman": HANGMAN_DIFFICULTIES,
+    "play_mathgame": MATH_MODES,
+}
+
+@timed("game_choice", chosen_game)
 async def game_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
+    choice, _, difficulty = query.data.partition(":")
+
+    if choice not in GAME_CHOICES:
+        await query.answer()
+        return
+
+    if choice in DIFFICULTY_CHOICES and not difficulty:
+        keyboard = [
+            [InlineKeyboardButton(level.capitalize(), callback_data=f"{choice}:{level}")]
+            for level in DIFFICULTY_CHOICES[choice]
+        ]
+        await query.message.reply_text("Choose a difficulty:", reply_markup=InlineKeyboardMarkup(keyboard))
+        await query.answer()
+        return
+
+    previous = context.user_data.get("gamebot")
+    if previous is not None:
+        previous.stop()
+
     gamebot = GameBot()
     context.user_data["gamebot"] = gamebot
 
-    if query.data == "play_wordle":
-        await query.message.reply_text("Type /stop to end your current game.")
-        await gamebot.start_game("Wordle", update, context)
-    elif query.data == "play_wordchain":
-        await query.message.reply_text("Type /stop to end your current game.")
-        await gamebot.start_game("WordChain", update, context)
-    elif query.data == "play_hangman":
-        await query.message.reply_text("Type /stop to end your current game.")
-        await gamebot.start_game("Hangman", update, context)
-    elif query.data == "play_unscramble":
-        await query.message.reply_text("Type /stop to end your current game.")
-        await gamebot.start_game("Unscramble Word", update, context)
-    elif query.data == "play_memorygame":
-        await query.message.reply_text("Type /stop to end your current game.")
-        await gamebot.start_game("Memory Game", update, context)
-    elif query.data == "play_mathgame":
-        await query.message.reply_text("Type /stop to end your current game.")
-        await gamebot.start_game("Math Game", update, context)
+    # Held by the limiter and sent with the game's first message.
+    send_notice(context.bot, query.message.chat_id, "Type /stop to end your current game.")
+    await gamebot.start_game(GAME_CHOICES[choice], update, context, difficulty=difficulty or None)
 
     await query.answer()
 
+@timed("handle_callback", current_game)
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -61,6 +133,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await gamebot.handle_guess(update, context)
 
+@timed("guess", current_game)
 async def guess(update: Update, context: ContextTypes.DEFAULT_TYPE):
     gamebot = context.user_data.get("gamebot")
     
@@ -70,29 +143,236 @@ async def guess(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         await gamebot.handle_guess(update, context)
-    except Exception as e:
-        print(f"Error handling guess: {str(e)}")
+    except Exception:
+        logger.exception("Error handling a guess from user %s", update.effective_user.id)
+        ERRORS.inc("guess", current_game(update, context))
         await update.message.reply_text("An error occurred while processing your guess. Please try again.")
 
+@timed("stop", current_game)
 async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if "current_game" in context.user_data:
         del context.user_data["current_game"]
     if "gamebot" in context.user_data:
+        context.user_data["gamebot"].stop()
         del context.user_data["gamebot"]
     await update.message.reply_text("Your game has been stopped.")
 
-def main():
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+@timed("profile")
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin only: /profile start|stop switches cProfile on and off and writes a summary file."""
+    profiler = context.bot_data["profiler"]
+    action = context.args[0].lower() if context.args else ""
+
+    if action == "start":
+        if profiler.running:
+            await update.message.reply_text("Already profiling. /profile stop writes the results.")
+            return
+        try:
+            profiler.start()
+        except ValueError as e:
+            await update.message.reply_text(f"Could not start profiling: {e}")
+            return
+        logger.info("Profiling started by user %s", update.effective_user.id)
+        await update.message.reply_text("Profiling started. /profile stop writes the results.")
+    elif action == "stop":
+        if not profiler.running:
+            await update.message.reply_text("Not profiling. Use /profile start.")
+            return
+        stats, seconds, raw = profiler.stop()
+        path = await asyncio.to_thread(profiler.write, stats, seconds, raw)
+        logger.info("Profile of %.1fs written to %s", seconds, path)
+        await update.message.reply_text(f"Profiled {seconds:.0f}s. Results written to {path}")
+    else:
+        state = "on" if profiler.running else "off"
+        await update.message.reply_text(f"Profiling is {state}. Usage: /profile start|stop")
+
+@timed("memsnap")
+async def memsnap(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin only: /memsnap turns tracemalloc on, then writes a snapshot each time; /memsnap stop turns it off."""
+    tracer = context.bot_data["memory_tracer"]
+    action = context.args[0].lower() if context.args else ""
+
+    if action == "stop":
+        if tracer.tracing:
+            tracer.stop()
+            await update.message.reply_text("Memory tracing stopped.")
+        else:
+            await update.message.reply_text("Memory tracing is off.")
+    elif not tracer.tracing:
+        tracer.start()
+        logger.info("Memory tracing started by user %s", update.effective_user.id)
+        await update.message.reply_text(
+            "Memory tracing started; only allocations from now on are seen. "
+            "Send /memsnap again to write a snapshot, or /memsnap stop to turn it off."
+        )
+    else:
+        path = await asyncio.to_thread(tracer.snapshot)
+        logger.info("Memory snapshot written to %s", path)
+        await update.message.reply_text(f"Memory snapshot written to {path}")
+
+def session_record(user_data):
+    game = user_data.get("current_game")
+    gamebot = user_data.get("gamebot")
+    if game is None or gamebot is None or getattr(game, "game_over", False):
+        return None
+    return gamebot.to_record(game)
+
+@timed("restore_session", current_game)
+async def restore_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Runs before the other handlers: brings back a saved game on a user's first update since startup."""
+    if update.effective_user is None or "session_checked" in context.user_data:
+        return
+    context.user_data["session_checked"] = True
+    if "gamebot" in context.user_data:
+        return
+
+    try:
+        record = await context.bot_data["sessions"].load(update.effective_user.id)
+        if record is None:
+            return
+        gamebot = GameBot()
+        game = gamebot.restore(record)
+    except Exception:
+        logger.exception("Could not restore the session of user %s", update.effective_user.id)
+        return
+    if game is not None:
+        context.user_data["gamebot"] = gamebot
+        context.user_data["current_game"] = game
+
+async def save_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Runs after the other handlers: queues the user's session to be saved."""
+    if update.effective_user is not None:
+        context.bot_data["sessions"].mark(update.effective_user.id, context.user_data)
+
+async def on_startup(application):
+    await application.bot_data["sessions"].open()
+    watchdog = application.bot_data.get("watchdog")
+    if watchdog is not None:
+        await watchdog.start()
+
+async def on_shutdown(application):
+    watchdog = application.bot_data.get("watchdog")
+    if watchdog is not None:
+        await watchdog.stop()
+    await application.bot_data["sessions"].close()
+
+async def log_error(update, context):
+    logger.error("Error while handling update %s", getattr(update, "update_id", None), exc_info=context.error)
+
+def active_sessions(application):
+    """Users with a game in progress, by game, read from every user's data at scrape time."""
+    counts = Counter()
+    for user_data in list(application.user_data.values()):
+        game = user_data.get("current_game")
+        if game is not None and not getattr(game, "game_over", False):
+            counts[game_label(game)] += 1
+    return [(
+        "gamebot_active_sessions", "Users with a game in progress, by game",
+        [({"game": game}, counts[game]) for game in GAME_CHOICES.values()]
+    )]
+
+def lexicon_families():
+    families = {}
+    for stats in lexicon_stats():
+        for name, help, samples in stats_families("gamebot_lexicon", stats, "Shared lexicon", {"lexicon": stats["name"]}):
+            families.setdefault(name, (name, help, []))[2].extend(samples)
+    return list(families.values())
+
+def register_metrics(application, rate_limiter):
+    """Expose the live stats of this application's update processor, send limiter, session store and lexicons."""
+    sessions = application.bot_data["sessions"]
+    REGISTRY.add_collector("active_sessions", lambda: active_sessions(application))
+    REGISTRY.add_collector(
+        "update_processor", lambda: stats_families("gamebot_updates", application.update_processor.stats(), "Update processor")
+    )
+    REGISTRY.add_collector("send_limiter", lambda: stats_families("gamebot_send_limiter", rate_limiter.stats(), "Send limiter"))
+    REGISTRY.add_collector("session_store", lambda: stats_families("gamebot_session_store", sessions.stats(), "Session store"))
+    REGISTRY.add_collector("lexicons", lexicon_families)
+    watchdog = application.bot_data.get("watchdog")
+    if watchdog is not None:
+        REGISTRY.add_collector("watchdog", lambda: stats_families("gamebot_watchdog", watchdog.stats(), "Loop watchdog"))
+
+def build_application(token=None, request=None, get_updates_request=None, rate_limiter=None, session_db=None):
+    """Build the Application with every handler registered; ``request`` lets tests swap the HTTP layer."""
+    rate_limiter = rate_limiter or SendLimiter()
+    builder = (
+        Application.builder()
+        .token(token or TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(KeyedUpdateProcessor(CONCURRENT_UPDATES, MAX_PENDING_UPDATES))
+        .rate_limiter(rate_limiter)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if request is not None:
+        builder = builder.request(request)
+    if get_updates_request is not None:
+        builder = builder.get_updates_request(get_updates_request)
+    application = builder.build()
+    application.bot_data["sessions"] = SessionStore(session_db or SESSION_DB, session_record)
+    application.bot_data["watchdog"] = LoopWatchdog(STALL_THRESHOLD) if STALL_THRESHOLD > 0 else None
+    application.bot_data["profiler"] = Profiler(PROFILE_DIR)
+    application.bot_data["memory_tracer"] = MemoryTracer(PROFILE_DIR)
+
+    application.add_handler(TypeHandler(Update, restore_session), group=-1)
+    application.add_handler(TypeHandler(Update, save_session), group=1)
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("play", play))
     application.add_handler(CommandHandler("stop", stop))
+    if ADMIN_USER_IDS:
+        admins = filters.User(user_id=ADMIN_USER_IDS)
+        application.add_handler(CommandHandler("profile", profile, filters=admins))
+        application.add_handler(CommandHandler("memsnap", memsnap, filters=admins))
 
     application.add_handler(CallbackQueryHandler(game_choice, pattern="^play_"))
     application.add_handler(CallbackQueryHandler(handle_callback))
 
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, guess))
-    application.run_polling()
+    application.add_error_handler(log_error)
+    register_metrics(application, rate_limiter)
+    return application
+
+def load_game_data():
+    """Open the shared word lists and build or load every game index before serving."""
+    preload("english-words.txt", "common-words.txt", "valid-words.json", "word-list.json")
+    get_transition_index(get_lexicon("english-words.txt"))
+    get_anagram_index(get_lexicon("common-words.txt"))
+    get_pattern_matrix()
+    get_answer_index()
+    get_guess_index()
+    get_puzzle_bank()
+    get_difficulty_index()
+
+def main():
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    load_game_data()
+
+    if SHARDS > 1:
+        # Workers are forked after load_game_data, so they share the loaded data with this process.
+        run_sharded(
+            SHARDS, build_application, TELEGRAM_BOT_TOKEN, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT,
+            secret_token=WEBHOOK_SECRET, webhook_workers=WEBHOOK_WORKERS, webhook_queue_size=WEBHOOK_QUEUE_SIZE,
+            queue_size=SHARD_QUEUE_SIZE, max_pending=MAX_PENDING_UPDATES,
+            metrics_port=METRICS_PORT, metrics_listen=METRICS_LISTEN
+        )
+        return
+
+    application = build_application()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT, METRICS_LISTEN)
+    logger.info(
+        "Processing up to %d updates concurrently (%d admitted), in order per user",
+        CONCURRENT_UPDATES, MAX_PENDING_UPDATES
+    )
+
+    if WEBHOOK_URL:
+        asyncio.run(serve_webhook(
+            application, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT,
+            secret_token=WEBHOOK_SECRET, workers=WEBHOOK_WORKERS, queue_size=WEBHOOK_QUEUE_SIZE
+        ))
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
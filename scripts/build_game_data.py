@@ -0,0 +1,55 @@
+"""Build the cached data files the games memory-map: all of them, or the ones named.
+
+Run from the repository root before starting the bot; files that are missing or
+outdated are otherwise rebuilt on first use.
+
+    python scripts/build_game_data.py [lexicons] [wordle] [math] [hangman]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.game.hangman_index import INDEX_FILE, build_difficulty_index
+from src.game.lexicon import compile_lexicon
+from src.game.math_bank import BANK_FILE, build_puzzle_bank
+from src.game.wordle_solver import MATRIX_FILE, build_pattern_matrix
+
+WORD_FILES = ["english-words.txt", "common-words.txt", "valid-words.json", "word-list.json"]
+
+
+def build_lexicons():
+    for source in WORD_FILES:
+        start = time.perf_counter()
+        target = compile_lexicon(source)
+        print(f"{source} -> {target} ({os.path.getsize(target) / 1e6:.2f} MB, {time.perf_counter() - start:.2f}s)")
+
+
+# In dependency order: the other files are built from the compiled lexicons.
+BUILDERS = {
+    "lexicons": build_lexicons,
+    "wordle": lambda: build_pattern_matrix(MATRIX_FILE),
+    "math": lambda: build_puzzle_bank(BANK_FILE),
+    "hangman": lambda: build_difficulty_index(INDEX_FILE),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help=f"what to build: {', '.join(BUILDERS)} (default: everything)")
+    args = parser.parse_args()
+    unknown = set(args.files) - set(BUILDERS)
+    if unknown:
+        parser.error(f"unknown files: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for name, build in BUILDERS.items():
+        if not args.files or name in args.files:
+            build()
+
+
+if __name__ == "__main__":
+    main()
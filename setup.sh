@@ -2,5 +2,6 @@ git pull
 python3 -m venv .venv
 source .venv/bin/activate
 pip install -r requirements.txt
+python3 scripts/build_game_data.py
 
 python3 main.py
\ No newline at end of file
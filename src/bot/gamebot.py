@@ -1,5 +1,7 @@
 # type: ignore
 
+import logging
+import time
 from telegram import Update
 from telegram.ext import ContextTypes
 from src.game.wordle import WordleGame
@@ -8,58 +10,126 @@ from src.game.hangman import HangmanGame
 from src.game.unscramble_word import UnscrambleGame
 from src.game.memory import MemoryGame
 from src.game.mathgame import MathGame
+from src.game.lexicon import get_lexicon
+from src.bot.rate_limiter import MERGE_SEPARATOR, send_notice
+from src.bot.metrics import ERRORS, GAME_SECONDS
+
+logger = logging.getLogger(__name__)
+
+GAME_OVER_MESSAGE = "Game over! Type /play to start again."
+
+SAVED_GAMES = {
+    "Wordle": WordleGame,
+    "WordChain": WordChainGame,
+    "Hangman": HangmanGame,
+    "Unscramble": UnscrambleGame,
+    "MathGame": MathGame,
+}
+
+# Metric labels; the same names start_game takes.
+GAME_LABELS = {
+    WordleGame: "Wordle",
+    WordChainGame: "WordChain",
+    HangmanGame: "Hangman",
+    UnscrambleGame: "Unscramble Word",
+    MemoryGame: "Memory Game",
+    MathGame: "Math Game",
+}
+
+def game_label(game):
+    return GAME_LABELS.get(type(game), "none")
 
 class GameBot:
+    __slots__ = ("games", "current_game", "words", "common_words")
+
     def __init__(self):
-        self.games = {
-            "Wordle": None,
-            "WordChain": None,
-            "Hangman": None,
-            "Unscramble": None,
-            "Memory": None,
-            "MathGame": None
-        }
+        # Only the games this player has started are kept.
+        self.games = {}
         self.current_game = None
         self.words = self.load_words("english-words.txt")
         self.common_words = self.load_words("common-words.txt")
 
     def load_words(self, filename):
-        with open(filename, "r") as file:
-            return {line.strip().lower() for line in file.readlines()}
+        return get_lexicon(filename)
+
+    def to_record(self, game):
+        """Return a small record of ``game`` for the session store, or None if it is not saved.
 
-    async def start_game(self, game_name, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        Memory Game is left out: its rounds are timed and tied to one message.
+        """
+        for key, game_class in SAVED_GAMES.items():
+            if type(game) is game_class:
+                return {"game": key, "state": game.to_record()}
+        return None
+
+    def restore(self, record):
+        """Recreate the game saved by ``to_record`` and make it current; returns it, or None."""
+        key, state = record["game"], record["state"]
+        if key == "Wordle":
+            game = WordleGame.from_record(state)
+        elif key == "WordChain":
+            game = WordChainGame.from_record(state, self.words)
+        elif key == "Hangman":
+            game = HangmanGame.from_record(state, self.common_words)
+        elif key == "Unscramble":
+            game = UnscrambleGame.from_record(state, self.common_words)
+        elif key == "MathGame":
+            game = MathGame.from_record(state)
+        else:
+            return None
+        self.games[key] = game
+        self.current_game = game
+        return game
+
+    def stop(self):
+        """Cancel any timers the games still have pending, e.g. when the player types /stop."""
+        for game in self.games.values():
+            if hasattr(game, "cancel_timers"):
+                game.cancel_timers()
+
+    async def start_game(self, game_name, update: Update, context: ContextTypes.DEFAULT_TYPE, difficulty=None):
+        start = time.perf_counter()
+        try:
+            await self._start_game(game_name, update, context, difficulty)
+        finally:
+            GAME_SECONDS.observe(time.perf_counter() - start, game_name, "start")
+
+    async def _start_game(self, game_name, update, context, difficulty):
         if game_name == "Wordle":
-            self.games["Wordle"] = WordleGame()
+            self.games["Wordle"] = WordleGame(hard_mode=difficulty == "hard")
             self.current_game = self.games["Wordle"]
             await self.current_game.start_game(update, context)
         elif game_name == "WordChain":
-            if self.games["WordChain"] is None:
+            if self.games.get("WordChain") is None:
                 self.games["WordChain"] = WordChainGame(self.words)
 
+            self.games["WordChain"].difficulty = difficulty or "easy"
             self.current_game = self.games["WordChain"]
             await self.current_game.start_game(update, context)
         elif game_name == "Hangman":
-            if self.games["Hangman"] is None:
-                self.games["Hangman"] = HangmanGame(list(self.common_words))
+            if self.games.get("Hangman") is None:
+                self.games["Hangman"] = HangmanGame(self.common_words)
 
+            self.games["Hangman"].difficulty = difficulty
             self.current_game = self.games["Hangman"]
             await self.current_game.start_game(update, context)
         elif game_name == "Unscramble Word":
-            if self.games["Unscramble"] is None:
-                self.games["Unscramble"] = UnscrambleGame(list(self.common_words))
+            if self.games.get("Unscramble") is None:
+                self.games["Unscramble"] = UnscrambleGame(self.common_words)
 
             self.current_game = self.games["Unscramble"]
             await self.current_game.start_game(update, context)
         elif game_name == "Memory Game":
-            if self.games["Memory"] is None:
+            if self.games.get("Memory") is None:
                 self.games["Memory"] = MemoryGame()
 
             self.current_game = self.games["Memory"]
             await self.current_game.start_game(update, context)
         elif game_name == "Math Game":
-            if self.games["MathGame"] is None:
+            if self.games.get("MathGame") is None:
                 self.games["MathGame"] = MathGame()
 
+            self.games["MathGame"].difficulty = difficulty
             self.current_game = self.games["MathGame"]
             await self.current_game.start_game(update, context)
         else:
@@ -70,6 +140,14 @@ class GameBot:
                 await update.callback_query.message.reply_text(reply_text)
 
     async def handle_guess(self, update, context):
+        label = game_label(self.current_game or context.user_data.get("current_game"))
+        start = time.perf_counter()
+        try:
+            await self._handle_guess(update, context)
+        finally:
+            GAME_SECONDS.observe(time.perf_counter() - start, label, "move")
+
+    async def _handle_guess(self, update, context):
         if self.current_game is None and "current_game" not in context.user_data:
             await update.message.reply_text("Please start a game first with /play.")
             return
@@ -80,6 +158,7 @@ class GameBot:
             await update.message.reply_text("Please start a game first with /play.")
             return
 
+        response = None
         try:
             if isinstance(game, WordleGame):
                 response = await game.handle_guess(update, context)
@@ -98,21 +177,23 @@ class GameBot:
                 response = "Unknown game type. Please start a new game."
 
             if response:
+                if getattr(game, "game_over", False):
+                    # One message: the limiter can only merge texts that are still waiting.
+                    response = f"{response}{MERGE_SEPARATOR}{GAME_OVER_MESSAGE}"
                 if update.message is not None:
                     await update.message.reply_text(response)
                 elif update.callback_query is not None:
                     await update.callback_query.message.reply_text(response)
 
-        except Exception as e:
-            print(f"Error handling guess: {e}")
+        except Exception:
+            logger.exception("Error handling a %s move", game_label(game))
+            ERRORS.inc("handle_guess", game_label(game))
+            response = None
             await update.message.reply_text("An error occurred. Please try again.")
 
         if hasattr(game, "game_over") and game.game_over:
             self.current_game = None
             if "current_game" in context.user_data:
                 del context.user_data["current_game"]
-            game_over_message = "Game over! Type /play to start again."
-            if update.message is not None:
-                await update.message.reply_text(game_over_message)
-            elif update.callback_query is not None:
-                await update.callback_query.message.reply_text(game_over_message)
+            if not response:
+                send_notice(context.bot, update.effective_chat.id, GAME_OVER_MESSAGE)
@@ -0,0 +1,248 @@
+import bisect
+import logging
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Seconds; handler latencies are mostly a few milliseconds, with Bot API round trips on top.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def reset(self):
+        self.values = {}
+
+    def samples(self):
+        for key, value in list(self.values.items()):
+            yield self.name, _format_labels(self.labels, key), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """A count that only goes up, per combination of label values."""
+
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, *labels, value):
+        self.values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    """Observations counted into fixed buckets; each label set keeps per-bucket counts, a sum and a count."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in list(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), list(counts)):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", _format_labels(self.labels, key, f'le="{_format_value(bound)}"'), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labels, key), total
+            yield f"{self.name}_count", _format_labels(self.labels, key), count
+
+
+class Registry:
+    """The metrics of one process, plus collectors called at scrape time for values kept elsewhere.
+
+    A collector returns ``(name, help, samples)`` tuples, where ``samples`` is a list of
+    ``(labels dict, value)``; they are exposed untyped.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, key, collect):
+        """Call ``collect()`` on every scrape; a later collector with the same ``key`` replaces it."""
+        with self._lock:
+            self.collectors[key] = collect
+
+    def remove_collector(self, key):
+        with self._lock:
+            self.collectors.pop(key, None)
+
+    def reset(self):
+        """Zero every metric and drop the collectors, e.g. in a freshly forked worker."""
+        with self._lock:
+            for metric in self.metrics.values():
+                metric.reset()
+            self.collectors.clear()
+
+    def render(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+            collectors = list(self.collectors.items())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for key, collect in collectors:
+            try:
+                families = list(collect())
+            except Exception:
+                logger.exception("Metrics collector %s failed", key)
+                continue
+            for name, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} untyped")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(labels, labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def stats_families(prefix, stats, help, labels=None):
+    """Turn a flat ``stats()`` dict into one collector family per numeric field."""
+    return [
+        (f"{prefix}_{key}", f"{help}: {key.replace('_', ' ')}", [(labels or {}, value)])
+        for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+
+
+REGISTRY = Registry()
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    "gamebot_handler_seconds", "Time spent in each update handler, by the game the user was playing",
+    ("handler", "game")
+)
+GAME_SECONDS = REGISTRY.histogram(
+    "gamebot_game_seconds", "Time spent starting games and handling moves, by game", ("game", "action")
+)
+ERRORS = REGISTRY.counter("gamebot_errors_total", "Exceptions raised while handling updates", ("handler", "game"))
+BOT_API_REQUESTS = REGISTRY.counter("gamebot_bot_api_requests_total", "Bot API requests sent, by method", ("method",))
+BOT_API_ERRORS = REGISTRY.counter("gamebot_bot_api_errors_total", "Bot API requests that failed, by method", ("method",))
+
+
+def timed(handler, game_of=None):
+    """Decorate an async handler to record its latency, and any exception, under ``handler``.
+
+    ``game_of(update, context)`` names the game for the label. It is asked before the
+    handler runs and, if that gives "none" (no game yet), again afterwards.
+    """
+    def decorate(function):
+        @wraps(function)
+        async def wrapper(update, context, *args, **kwargs):
+            game = game_of(update, context) if game_of else "none"
+            start = time.perf_counter()
+            failed = False
+            try:
+                return await function(update, context, *args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                if game == "none" and game_of:
+                    game = game_of(update, context)
+                HANDLER_SECONDS.observe(elapsed, handler, game)
+                if failed:
+                    ERRORS.inc(handler, game)
+        return wrapper
+    return decorate
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, listen="127.0.0.1", registry=REGISTRY):
+    """Serve ``registry`` at ``http://listen:port/metrics`` from a daemon thread.
+
+    The server runs outside the event loop, so it still answers while the loop is busy.
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((listen, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", listen, server.server_address[1])
+    return server
@@ -0,0 +1,150 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+import src.game
+
+PROFILE_DIR = "profiles"
+TOP_FUNCTIONS = 30
+TOP_PER_MODULE = 10
+TRACE_FRAMES = 10
+
+GAME_DIR = os.path.dirname(os.path.abspath(src.game.__file__))
+
+
+def game_module(filename):
+    """``src/game/<name>.py`` for files in the game package, else None."""
+    path = os.path.abspath(filename)
+    if os.path.dirname(path) != GAME_DIR:
+        return None
+    return f"src/game/{os.path.basename(path)}"
+
+
+def _artifact_path(directory, kind, extension):
+    os.makedirs(directory, exist_ok=True)
+    # The pid tells apart files written by shard workers at the same moment.
+    return os.path.join(directory, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.{extension}")
+
+
+class Profiler:
+    """cProfile switched on and off at runtime; ``stop`` writes a summary of where the time went.
+
+    Only the event loop's thread is profiled, which is where every handler and game runs.
+    """
+
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self.profile = None
+        self.started = None
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def start(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        self.profile = profile
+        self.started = time.monotonic()
+
+    def stop(self):
+        """Stop profiling; return the stats, the seconds profiled and the raw profile."""
+        profile, self.profile = self.profile, None
+        profile.disable()
+        return pstats.Stats(profile), time.monotonic() - self.started, profile
+
+    def write(self, stats, seconds, profile):
+        """Write the summary (and the raw ``.prof`` next to it) and return the summary's path."""
+        path = _artifact_path(self.directory, "profile", "txt")
+        profile.dump_stats(path[:-len(".txt")] + ".prof")
+
+        out = io.StringIO()
+        out.write(f"Profiled {seconds:.1f}s on the event loop thread.\n\n")
+        stats.stream = out
+        out.write(f"== Top {TOP_FUNCTIONS} functions by cumulative time\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        out.write(f"== Top {TOP_FUNCTIONS} functions by own time\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_FUNCTIONS)
+
+        modules = {}
+        for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            module = game_module(filename)
+            if module is not None:
+                modules.setdefault(module, []).append((own, cumulative, calls, f"{function} (line {line})"))
+        out.write("== Game modules by own time\n")
+        for module, functions in sorted(modules.items(), key=lambda item: -sum(f[0] for f in item[1])):
+            out.write(f"\n{module}: {sum(f[0] for f in functions):.3f}s own time\n")
+            out.write(f"  {'own s':>9} {'cum s':>9} {'calls':>9}  function\n")
+            for own, cumulative, calls, name in sorted(functions, reverse=True)[:TOP_PER_MODULE]:
+                out.write(f"  {own:>9.4f} {cumulative:>9.4f} {calls:>9}  {name}\n")
+
+        with open(path, "w") as file:
+            file.write(out.getvalue())
+        return path
+
+
+class MemoryTracer:
+    """tracemalloc switched on and off at runtime; each snapshot writes the top allocation sites."""
+
+    def __init__(self, directory=PROFILE_DIR, frames=TRACE_FRAMES):
+        self.directory = directory
+        self.frames = frames
+        self.previous = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        tracemalloc.start(self.frames)
+        self.previous = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self.previous = None
+
+    def snapshot(self):
+        """Write allocation sites overall, per game module and since the last snapshot; return the path."""
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        path = _artifact_path(self.directory, "memsnap", "txt")
+
+        out = io.StringIO()
+        out.write(f"Traced memory: {current / 1e6:.1f} MB now, {peak / 1e6:.1f} MB peak.\n\n")
+        out.write(f"== Top {TOP_FUNCTIONS} allocation sites\n")
+        for stat in snapshot.statistics("lineno")[:TOP_FUNCTIONS]:
+            out.write(f"{stat}\n")
+
+        # Grouped by the innermost game-module frame, so allocations made for a game inside
+        # library code are still charged to it.
+        modules = {}
+        for trace in snapshot.traces:
+            for frame in reversed(trace.traceback):
+                module = game_module(frame.filename)
+                if module is not None:
+                    sites = modules.setdefault(module, {})
+                    site = sites.setdefault(frame.lineno, [0, 0])
+                    site[0] += trace.size
+                    site[1] += 1
+                    break
+        out.write("\n== Game modules by allocated size\n")
+        for module, sites in sorted(modules.items(), key=lambda item: -sum(s[0] for s in item[1].values())):
+            out.write(f"\n{module}: {sum(s[0] for s in sites.values()) / 1024:.1f} KiB\n")
+            for line, (size, count) in sorted(sites.items(), key=lambda item: -item[1][0])[:TOP_PER_MODULE]:
+                out.write(f"  line {line}: {size / 1024:.1f} KiB in {count} blocks\n")
+
+        if self.previous is not None:
+            out.write(f"\n== Top {TOP_FUNCTIONS} changes since the last snapshot\n")
+            for stat in snapshot.compare_to(self.previous, "lineno")[:TOP_FUNCTIONS]:
+                out.write(f"{stat}\n")
+        self.previous = snapshot
+
+        with open(path, "w") as file:
+            file.write(out.getvalue())
+        return path
@@ -0,0 +1,340 @@
+import asyncio
+import heapq
+import html
+import itertools
+import logging
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from telegram.helpers import escape_markdown
+
+from .metrics import BOT_API_ERRORS, BOT_API_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Pass as ``rate_limit_args={"priority": ANNOUNCEMENT}``; lower values are sent first.
+INTERACTIVE = 0
+ANNOUNCEMENT = 1
+# A request waiting this long for the global bucket goes ahead of new ones one priority
+# level more urgent, so announcements are late under load but never starve.
+PRIORITY_SECONDS = 2.0
+
+MAX_MESSAGE_LENGTH = 4096
+MERGE_SEPARATOR = "\n\n"
+# How long a notice waits for the chat's next message to go out with.
+NOTICE_HOLD_SECONDS = 0.5
+
+# Notices being sent, kept so their tasks are not garbage collected midway.
+_notice_tasks = set()
+
+
+class TokenBucket:
+    """Allows ``burst`` requests at once, refilled at ``rate`` requests per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Take a token and return 0, or return the seconds until one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def full(self):
+        self._refill()
+        return self.tokens >= self.burst
+
+
+def _text_length(text):
+    # Telegram counts message length in UTF-16 code units.
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _escape(text, parse_mode):
+    """Return plain ``text`` escaped to read the same inside a message sent with ``parse_mode``."""
+    if parse_mode == "Markdown":
+        return escape_markdown(text)
+    if parse_mode == "MarkdownV2":
+        return escape_markdown(text, version=2)
+    if parse_mode == "HTML":
+        return html.escape(text, quote=False)
+    return text
+
+
+def send_notice(bot, chat_id, text):
+    """Send the plain ``text`` to ``chat_id`` without waiting for it.
+
+    With a ``SendLimiter`` the notice goes out with the chat's next message; see
+    ``SendLimiter.notify``.
+    """
+    if isinstance(getattr(bot, "rate_limiter", None), SendLimiter):
+        bot.rate_limiter.notify(bot, chat_id, text)
+    else:
+        _start_notice(bot.send_message(chat_id, text), chat_id)
+
+
+def _start_notice(coroutine, chat_id):
+    task = asyncio.get_running_loop().create_task(coroutine)
+    _notice_tasks.add(task)
+    task.add_done_callback(lambda task: _notice_sent(task, chat_id))
+
+
+def _notice_sent(task, chat_id):
+    _notice_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Could not send a notice to chat %s", chat_id, exc_info=task.exception())
+
+
+class _Request:
+    def __init__(self, endpoint, data, priority):
+        self.endpoint = endpoint
+        self.data = data
+        self.priority = priority
+        self.queued = time.monotonic()
+        self.result = asyncio.get_running_loop().create_future()
+
+    def merge(self, endpoint, data):
+        """Append a later sendMessage's text to this queued one if nothing else about them differs."""
+        if endpoint != "sendMessage" or self.endpoint != "sendMessage":
+            return False
+        if self.data.get("reply_markup") is not None or "entities" in self.data or "entities" in data:
+            return False
+        if self.data.keys() - {"reply_markup"} != data.keys() - {"reply_markup"}:
+            return False
+        if any(self.data[key] != value for key, value in data.items() if key not in ("text", "reply_markup")):
+            return False
+
+        text = self.data["text"] + MERGE_SEPARATOR + data["text"]
+        if _text_length(text) > MAX_MESSAGE_LENGTH:
+            return False
+        self.data["text"] = text
+        if data.get("reply_markup") is not None:
+            self.data["reply_markup"] = data["reply_markup"]
+        return True
+
+
+class _Chat:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.lock = asyncio.Lock()
+        self.pending = deque()
+        self.notices = []
+        self.notice_timer = None
+
+    def idle(self):
+        return not self.pending and not self.notices and not self.lock.locked()
+
+    def take_notices(self, data):
+        """Put the held notices in front of the sendMessage ``data``; returns how many, or 0 if they don't fit."""
+        if not self.notices or "entities" in data:
+            return 0
+        parse_mode = data.get("parse_mode")
+        text = MERGE_SEPARATOR.join([_escape(notice, parse_mode) for notice in self.notices] + [data["text"]])
+        if _text_length(text) > MAX_MESSAGE_LENGTH:
+            return 0
+        data["text"] = text
+        count = len(self.notices)
+        self.notices.clear()
+        self.notice_timer.cancel()
+        self.notice_timer = None
+        return count
+
+
+class SendLimiter(BaseRateLimiter):
+    """Paces outgoing requests with a global and a per-chat token bucket.
+
+    Requests to one chat are sent one at a time in order; a sendMessage still waiting for
+    its turn absorbs later texts to the same chat, so a burst of replies goes out as one
+    message, and notices passed to ``notify`` ride along with the chat's next message.
+    Chats then compete for the global bucket by priority, interactive replies before
+    announcements that have waited less than ``PRIORITY_SECONDS`` longer. Requests
+    without a chat (answering callback queries, getMe) are not limited. A request hit by
+    a flood-control ``RetryAfter`` is retried after the advised delay, up to
+    ``max_retries`` times, holding back the rest of its chat.
+    """
+
+    def __init__(
+        self,
+        overall_rate=30,
+        overall_burst=30,
+        chat_rate=1,
+        chat_burst=3,
+        group_rate=20 / 60,
+        group_burst=3,
+        max_retries=2,
+    ):
+        self.overall = TokenBucket(overall_rate, overall_burst)
+        self.chat_limits = (chat_rate, chat_burst)
+        self.group_limits = (group_rate, group_burst)
+        self.max_retries = max_retries
+
+        self._chats = {}
+        self._prune_at = 1024
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._release_task = None
+        self._stats = {
+            "queue_depth": 0,
+            "peak_queue_depth": 0,
+            "sent": 0,
+            "merged": 0,
+            "retries": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        if self._release_task is not None:
+            self._release_task.cancel()
+            self._release_task = None
+        for chat in self._chats.values():
+            if chat.notice_timer is not None:
+                chat.notice_timer.cancel()
+                chat.notice_timer = None
+
+    def _chat(self, chat_id):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            if len(self._chats) >= self._prune_at:
+                self._prune()
+            is_group = isinstance(chat_id, int) and chat_id < 0
+            chat = self._chats[chat_id] = _Chat(TokenBucket(*(self.group_limits if is_group else self.chat_limits)))
+        return chat
+
+    def notify(self, bot, chat_id, text):
+        """Send the plain ``text`` to ``chat_id`` at announcement priority without waiting for it.
+
+        The notice is held for up to ``NOTICE_HOLD_SECONDS`` and put in front of the next
+        sendMessage to the chat, so a notice and the reply after it go out as one message.
+        If nothing follows in time it is sent on its own; errors are logged.
+        """
+        chat = self._chat(chat_id)
+        chat.notices.append(text)
+        if chat.notice_timer is None:
+            chat.notice_timer = asyncio.get_running_loop().call_later(
+                NOTICE_HOLD_SECONDS, self._send_notices, bot, chat_id
+            )
+
+    def _send_notices(self, bot, chat_id):
+        chat = self._chats[chat_id]
+        text = MERGE_SEPARATOR.join(chat.notices)
+        chat.notices.clear()
+        chat.notice_timer = None
+        _start_notice(bot.send_message(chat_id, text, rate_limit_args={"priority": ANNOUNCEMENT}), chat_id)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            try:
+                result = await callback(*args, **kwargs)
+            except Exception:
+                BOT_API_ERRORS.inc(endpoint)
+                raise
+            BOT_API_REQUESTS.inc(endpoint)
+            return result
+
+        chat = self._chat(chat_id)
+        if endpoint == "sendMessage":
+            self._stats["merged"] += chat.take_notices(data)
+
+        if chat.pending and chat.pending[-1].merge(endpoint, data):
+            self._stats["merged"] += 1
+            return await asyncio.shield(chat.pending[-1].result)
+
+        priority = (rate_limit_args or {}).get("priority", INTERACTIVE)
+        request = _Request(endpoint, data, priority)
+        chat.pending.append(request)
+        stats = self._stats
+        stats["queue_depth"] += 1
+        stats["peak_queue_depth"] = max(stats["peak_queue_depth"], stats["queue_depth"])
+
+        # Sending runs in its own task so a cancelled caller cannot drop texts merged into it.
+        asyncio.get_running_loop().create_task(self._send(chat, request, callback, args, kwargs))
+        return await asyncio.shield(request.result)
+
+    async def _send(self, chat, request, callback, args, kwargs):
+        stats = self._stats
+        try:
+            async with chat.lock:
+                while delay := chat.bucket.take():
+                    await asyncio.sleep(delay)
+                await self._acquire_overall(request.priority)
+
+                chat.pending.remove(request)
+                stats["queue_depth"] -= 1
+                waited = time.monotonic() - request.queued
+                stats["wait_seconds_total"] += waited
+                stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+
+                for attempt in itertools.count():
+                    try:
+                        result = await callback(*args, **kwargs)
+                        break
+                    except RetryAfter as exc:
+                        if attempt >= self.max_retries:
+                            raise
+                        retry_after = exc.retry_after
+                        if hasattr(retry_after, "total_seconds"):
+                            retry_after = retry_after.total_seconds()
+                        stats["retries"] += 1
+                        logger.warning("Flood control on chat %s, retrying in %ss", request.data.get("chat_id"), retry_after)
+                        await asyncio.sleep(retry_after + 0.1)
+                stats["sent"] += 1
+                BOT_API_REQUESTS.inc(request.endpoint)
+                request.result.set_result(result)
+        except Exception as exc:
+            BOT_API_ERRORS.inc(request.endpoint)
+            if request in chat.pending:
+                chat.pending.remove(request)
+                stats["queue_depth"] -= 1
+            request.result.set_exception(exc)
+
+    async def _acquire_overall(self, priority):
+        if not self._waiters and not self.overall.take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        due = time.monotonic() + priority * PRIORITY_SECONDS
+        heapq.heappush(self._waiters, (due, next(self._sequence), future))
+        if self._release_task is None or self._release_task.done():
+            self._release_task = asyncio.get_running_loop().create_task(self._release_waiters())
+        await future
+
+    async def _release_waiters(self):
+        while self._waiters:
+            delay = self.overall.take()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            future = heapq.heappop(self._waiters)[2]
+            if not future.done():
+                future.set_result(None)
+
+    def _prune(self):
+        """Forget idle chats whose bucket has refilled, so they lose nothing by being dropped."""
+        for chat_id in [chat_id for chat_id, chat in self._chats.items() if chat.idle() and chat.bucket.full()]:
+            del self._chats[chat_id]
+        self._prune_at = max(1024, 2 * len(self._chats))
+
+    def stats(self):
+        """Queue depth, send and merge counts, and how long requests waited for their turn."""
+        stats = dict(self._stats)
+        sent = stats["sent"]
+        stats["wait_seconds_mean"] = stats["wait_seconds_total"] / sent if sent else 0.0
+        stats["overall_waiting"] = len(self._waiters)
+        stats["chats"] = len(self._chats)
+        return stats
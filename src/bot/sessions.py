@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0
+BATCH_SIZE = 500
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS sessions (user_id INTEGER PRIMARY KEY, record TEXT NOT NULL, updated REAL NOT NULL)"
+
+
+class SessionStore:
+    """Saves one small JSON record per user in SQLite (WAL mode), written behind in batches.
+
+    ``mark`` only notes that a user's session changed; every ``flush_interval`` seconds,
+    or once ``batch_size`` users are waiting, ``snapshot(source)`` turns each marked
+    session into a record (None to delete it) and all of them are written in one
+    transaction. A user marked many times between flushes is serialized once. Database
+    work runs on a single background thread, so the event loop never waits on disk.
+    """
+
+    def __init__(self, path, snapshot, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        self.path = path
+        self.snapshot = snapshot
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sessions")
+        self._connection = None
+        self._open_lock = asyncio.Lock()
+        self._dirty = {}
+        self._saved = set()
+        self._wake = None
+        self._flush_task = None
+        self._stats = {"loads": 0, "restored": 0, "written": 0, "deleted": 0, "batches": 0, "flush_seconds_total": 0.0}
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _open(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # Shard workers share the file; wait for each other's write transactions.
+        connection.execute("PRAGMA busy_timeout=5000")
+        connection.execute(SCHEMA)
+        connection.commit()
+        return connection
+
+    async def open(self):
+        if self._connection is not None:
+            return
+        # Concurrent first loads must share one connection and one flush task.
+        async with self._open_lock:
+            if self._connection is None:
+                connection = await self._run(self._open)
+                self._wake = asyncio.Event()
+                self._flush_task = asyncio.create_task(self._flush_loop())
+                self._connection = connection
+                logger.info("Session store %s opened", self.path)
+
+    async def close(self):
+        if self._connection is None:
+            return
+        self._flush_task.cancel()
+        await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+        await self._run(self._connection.close)
+        self._connection = None
+
+    def _select(self, user_id):
+        row = self._connection.execute("SELECT record FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    async def load(self, user_id):
+        """Return the saved record for ``user_id``, or None."""
+        await self.open()
+        self._stats["loads"] += 1
+        text = await self._run(self._select, user_id)
+        if text is None:
+            return None
+        self._saved.add(user_id)
+        self._stats["restored"] += 1
+        return json.loads(text)
+
+    def mark(self, user_id, source):
+        """Note that ``user_id``'s session, held in ``source``, may have changed."""
+        self._dirty[user_id] = source
+        if len(self._dirty) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Could not save sessions")
+
+    def _write(self, upserts, deletes):
+        with self._connection:
+            if upserts:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO sessions (user_id, record, updated) VALUES (?, ?, ?)", upserts
+                )
+            if deletes:
+                self._connection.executemany("DELETE FROM sessions WHERE user_id = ?", deletes)
+
+    async def flush(self):
+        if not self._dirty or self._connection is None:
+            return
+        dirty, self._dirty = self._dirty, {}
+
+        # Snapshot on the event loop, where the games are mutated, then write in the background.
+        now = time.time()
+        upserts, deletes = [], []
+        for user_id, source in dirty.items():
+            record = self.snapshot(source)
+            if record is not None:
+                upserts.append((user_id, json.dumps(record, separators=(",", ":")), now))
+                self._saved.add(user_id)
+            elif user_id in self._saved:
+                deletes.append((user_id,))
+                self._saved.discard(user_id)
+        if not upserts and not deletes:
+            return
+
+        start = time.perf_counter()
+        await self._run(self._write, upserts, deletes)
+        stats = self._stats
+        stats["written"] += len(upserts)
+        stats["deleted"] += len(deletes)
+        stats["batches"] += 1
+        stats["flush_seconds_total"] += time.perf_counter() - start
+
+    def stats(self):
+        """Loads and restores, rows written and deleted, batches and users waiting to be saved."""
+        return {**self._stats, "pending": len(self._dirty)}
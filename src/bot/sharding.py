@@ -0,0 +1,388 @@
+import asyncio
+import contextlib
+import gc
+import json
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from urllib.parse import urlsplit
+
+from telegram import Bot, Update
+from telegram.error import InvalidToken, RetryAfter, TelegramError, TimedOut
+from telegram.request import HTTPXRequest
+
+from .metrics import REGISTRY, start_metrics_server, stats_families
+from .rate_limiter import SendLimiter
+from .webhook import WebhookServer
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 10
+# Longest wait between getUpdates retries after repeated errors.
+POLL_MAX_BACKOFF = 30.0
+HEARTBEAT_INTERVAL = 1.0
+HEALTH_CHECK_INTERVAL = 15.0
+# A worker that has not reported for this long is logged as unresponsive.
+STALE_AFTER = 10.0
+STOP_TIMEOUT = 10.0
+
+OVERALL_RATE = 30
+HEALTH_FIELDS = ("pid", "heartbeat", "processed", "failed", "in_flight")
+
+
+def shard_key(data):
+    """The user an update comes from (or its chat, failing that), read from the raw update dict.
+
+    Sessions live in per-user data, so routing by user keeps a session on one worker.
+    """
+    for value in data.values():
+        if isinstance(value, dict):
+            user = value.get("from") or value.get("user")
+            if user:
+                return user["id"]
+            chat = value.get("chat")
+            if chat:
+                return chat["id"]
+    return 0
+
+
+class ShardHealth:
+    """Per-shard counters in shared memory, written by each worker and read by the front process."""
+
+    def __init__(self, context, shards):
+        self.values = context.Array("d", shards * len(HEALTH_FIELDS), lock=False)
+
+    def write(self, shard, **fields):
+        base = shard * len(HEALTH_FIELDS)
+        for name, value in fields.items():
+            self.values[base + HEALTH_FIELDS.index(name)] = value
+
+    def read(self, shard):
+        base = shard * len(HEALTH_FIELDS)
+        return {name: self.values[base + i] for i, name in enumerate(HEALTH_FIELDS)}
+
+
+def run_worker(shard, shards, updates, health, build_application, max_pending, metrics_port=None, metrics_listen="127.0.0.1"):
+    """Worker process entry point: serve the updates routed to ``shard`` until a None arrives.
+
+    With ``metrics_port`` set, the worker serves its own metrics on ``metrics_port + 1 + shard``.
+    """
+    # Ctrl+C reaches the whole process group; the front process decides when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+    # A forked worker starts with a copy of the front process's metrics; count its own from zero.
+    REGISTRY.reset()
+    if metrics_port:
+        start_metrics_server(metrics_port + 1 + shard, metrics_listen)
+
+    # Workers share Telegram's global message rate between them; a chat's limit stays whole.
+    limiter = SendLimiter(overall_rate=OVERALL_RATE / shards, overall_burst=max(1, OVERALL_RATE // shards))
+    application = build_application(rate_limiter=limiter)
+    asyncio.run(_serve_shard(shard, updates, health, application, max_pending))
+
+
+async def _serve_shard(shard, updates, health, application, max_pending):
+    loop = asyncio.get_running_loop()
+    slots = threading.BoundedSemaphore(max_pending)
+    counts = {"processed": 0, "failed": 0, "in_flight": 0}
+    finished = asyncio.Event()
+
+    async def process(data):
+        counts["in_flight"] += 1
+        try:
+            update = Update.de_json(data, application.bot)
+            await application.update_processor.process_update(update, application.process_update(update))
+            counts["processed"] += 1
+        except Exception:
+            counts["failed"] += 1
+            logger.exception("Shard %d could not process an update", shard)
+        finally:
+            counts["in_flight"] -= 1
+            slots.release()
+
+    def read_updates():
+        # Runs in a thread: blocks on the process queue, then schedules each update on the
+        # event loop in arrival order. ``slots`` stops reading while ``max_pending`` are in
+        # progress, so a backlog stays in the queue and pushes back on the front process.
+        while True:
+            data = updates.get()
+            if data is None:
+                loop.call_soon_threadsafe(finished.set)
+                return
+            slots.acquire()
+            asyncio.run_coroutine_threadsafe(process(data), loop)
+
+    async def heartbeat():
+        while True:
+            health.write(shard, heartbeat=time.time(), **counts)
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        health.write(shard, pid=multiprocessing.current_process().pid)
+        beat = asyncio.create_task(heartbeat())
+        threading.Thread(target=read_updates, name=f"shard-{shard}-reader", daemon=True).start()
+        logger.info("Shard %d ready", shard)
+
+        await finished.wait()
+        while counts["in_flight"]:
+            await asyncio.sleep(0.05)
+        beat.cancel()
+        health.write(shard, heartbeat=time.time(), **counts)
+        await application.stop()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+class ShardRouter:
+    """Front-process side of sharding: owns the worker processes and routes updates to them.
+
+    Each update goes to worker ``shard_key(update) % shards`` over a bounded process queue.
+    Workers are forked after the game data is loaded. The memory-mapped lexicons, Wordle
+    pattern matrix, math puzzle bank and Hangman index stay shared. The WordChain
+    ``TransitionIndex``, Unscramble ``AnagramIndex`` and Wordle ``AnswerIndex``es are plain
+    Python objects, shared only copy-on-write: every read updates reference counts, so a
+    worker gradually copies their pages, about 3.5 MB in all. The heap is frozen before
+    each fork so the garbage collector does not copy the rest of it (another 12 MB or so
+    per worker otherwise). Where fork is unavailable workers are spawned and build their
+    own indexes; the mapped files are still shared through the OS page cache.
+    """
+
+    def __init__(self, shards, build_application, queue_size=1024, max_pending=1024, metrics_port=None, metrics_listen="127.0.0.1"):
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self.shards = shards
+        self.build_application = build_application
+        self.max_pending = max_pending
+        self.queue_size = queue_size
+        self.metrics_port = metrics_port
+        self.metrics_listen = metrics_listen
+        self.queues = [self.context.Queue(queue_size) for _ in range(shards)]
+        self.health = ShardHealth(self.context, shards)
+        self.processes = [None] * shards
+        self.restarts = [0] * shards
+
+    def start(self):
+        for shard in range(self.shards):
+            self._start_worker(shard)
+
+    def _start_worker(self, shard):
+        if self.context.get_start_method() == "fork":
+            # Keep collections in the worker from writing to every inherited object.
+            gc.freeze()
+        process = self.context.Process(
+            target=run_worker,
+            args=(
+                shard, self.shards, self.queues[shard], self.health, self.build_application, self.max_pending,
+                self.metrics_port, self.metrics_listen
+            ),
+            name=f"gamebot-shard-{shard}",
+        )
+        process.start()
+        self.processes[shard] = process
+
+    async def route(self, data):
+        """Queue a raw update dict for its shard, waiting (without blocking the loop) if the queue is full."""
+        shard_queue = self.queues[shard_key(data) % self.shards]
+        try:
+            shard_queue.put_nowait(data)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, shard_queue.put, data)
+
+    def health_report(self):
+        """One dict per shard: pid, alive, seconds since the last heartbeat, counters and queue depth."""
+        now = time.time()
+        report = []
+        for shard, process in enumerate(self.processes):
+            values = self.health.read(shard)
+            try:
+                depth = self.queues[shard].qsize()
+            except NotImplementedError:
+                depth = -1
+            report.append({
+                "shard": shard,
+                "pid": int(values["pid"]),
+                "alive": process is not None and process.is_alive(),
+                "heartbeat_age": now - values["heartbeat"] if values["heartbeat"] else None,
+                "processed": int(values["processed"]),
+                "failed": int(values["failed"]),
+                "in_flight": int(values["in_flight"]),
+                "queue_depth": depth,
+                "restarts": self.restarts[shard],
+            })
+        return report
+
+    def metric_families(self):
+        """``health_report`` as metric families labelled by shard, for the front process's registry."""
+        report = self.health_report()
+        fields = ("alive", "heartbeat_age", "processed", "failed", "in_flight", "queue_depth", "restarts")
+        return [
+            (f"gamebot_shard_{field}", f"Shard worker {field.replace('_', ' ')}", [
+                ({"shard": status["shard"]}, None if status[field] is None else float(status[field])) for status in report
+            ])
+            for field in fields
+        ]
+
+    def check(self):
+        """Restart workers that have died and log those that stopped reporting."""
+        for status in self.health_report():
+            shard = status["shard"]
+            if not status["alive"]:
+                logger.error(
+                    "Shard %d (pid %d) exited with code %s; restarting it, its sessions are lost",
+                    shard, status["pid"], self.processes[shard].exitcode
+                )
+                self.restarts[shard] += 1
+                # The dead worker may have held the queue's read lock, so start afresh.
+                self.queues[shard] = self.context.Queue(self.queue_size)
+                self._start_worker(shard)
+            elif status["heartbeat_age"] is not None and status["heartbeat_age"] > STALE_AFTER:
+                logger.warning("Shard %d has not reported for %.0fs", shard, status["heartbeat_age"])
+
+    def stop(self):
+        for shard_queue in self.queues:
+            shard_queue.put(None)
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+
+class ShardWebhookServer(WebhookServer):
+    """Webhook server that forwards each update to its shard instead of processing it here."""
+
+    def __init__(self, router, *args, **kwargs):
+        super().__init__(None, *args, **kwargs)
+        self.router = router
+
+    async def process(self, body):
+        await self.router.route(json.loads(body))
+
+
+async def _poll(router, bot):
+    """Route updates from getUpdates until cancelled.
+
+    Failures are retried as PTB's updater retries them: after ``retry_after`` on flood
+    control, at once on a timeout and with a growing delay on other errors. An invalid
+    token is raised. On the way out the offset of the last routed update is confirmed,
+    so a restart doesn't fetch and route that batch again.
+    """
+    await bot.delete_webhook()
+    offset = None
+    delay = 0.0
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=POLL_TIMEOUT, allowed_updates=Update.ALL_TYPES)
+            except RetryAfter as exc:
+                retry_after = exc.retry_after
+                if hasattr(retry_after, "total_seconds"):
+                    retry_after = retry_after.total_seconds()
+                logger.warning("getUpdates hit flood control, retrying in %ss", retry_after)
+                await asyncio.sleep(retry_after + 0.5)
+                continue
+            except TimedOut:
+                continue
+            except InvalidToken:
+                raise
+            except TelegramError as exc:
+                delay = min(POLL_MAX_BACKOFF, 1.5 * delay or 1.0)
+                logger.warning("getUpdates failed (%s), retrying in %.1fs", exc, delay)
+                await asyncio.sleep(delay)
+                continue
+            delay = 0.0
+            for update in updates:
+                await router.route(update.to_dict())
+                offset = update.update_id + 1
+    finally:
+        if offset is not None:
+            try:
+                await bot.get_updates(offset=offset, timeout=0, allowed_updates=Update.ALL_TYPES)
+            except TelegramError:
+                logger.exception("Could not confirm the last updates; they may be routed again after a restart")
+
+
+async def _monitor(router):
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        router.check()
+
+
+async def _serve_front(router, token, webhook_url, listen, port, secret_token, webhook_workers, webhook_queue_size):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    bot = Bot(token, get_updates_request=HTTPXRequest(read_timeout=POLL_TIMEOUT + 5))
+    REGISTRY.add_collector("shards", router.metric_families)
+    async with bot:
+        monitor = asyncio.create_task(_monitor(router))
+        try:
+            if webhook_url:
+                server = ShardWebhookServer(
+                    router, listen, port, urlsplit(webhook_url).path or "/", secret_token, webhook_workers, webhook_queue_size
+                )
+                REGISTRY.add_collector("webhook", lambda: stats_families("gamebot_webhook", server.stats(), "Webhook intake"))
+                await bot.set_webhook(
+                    webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES,
+                    max_connections=min(100, max(1, webhook_workers))
+                )
+                await server.start()
+                await stop.wait()
+                await server.stop()
+            else:
+                poller = asyncio.create_task(_poll(router, bot))
+                stopping = asyncio.create_task(stop.wait())
+                await asyncio.wait((poller, stopping), return_when=asyncio.FIRST_COMPLETED)
+                stopping.cancel()
+                poller.cancel()
+                # If polling ended by itself, this raises why and the bot stops.
+                with contextlib.suppress(asyncio.CancelledError):
+                    await poller
+        finally:
+            monitor.cancel()
+
+
+def run_sharded(
+    shards,
+    build_application,
+    token,
+    webhook_url=None,
+    listen="0.0.0.0",
+    port=8443,
+    secret_token=None,
+    webhook_workers=64,
+    webhook_queue_size=1024,
+    queue_size=1024,
+    max_pending=1024,
+    metrics_port=None,
+    metrics_listen="127.0.0.1",
+):
+    """Receive updates in this process and serve them from ``shards`` worker processes until stopped.
+
+    ``build_application(rate_limiter=...)`` is called in each worker to build its Application.
+    With ``metrics_port`` set, this process serves shard health on it and worker ``i`` its
+    own metrics on ``metrics_port + 1 + i``.
+    """
+    router = ShardRouter(shards, build_application, queue_size, max_pending, metrics_port, metrics_listen)
+    router.start()
+    logger.info("Started %d shard workers", shards)
+    if metrics_port:
+        start_metrics_server(metrics_port, metrics_listen)
+    try:
+        asyncio.run(_serve_front(
+            router, token, webhook_url, listen, port, secret_token, webhook_workers, webhook_queue_size
+        ))
+    finally:
+        router.stop()
+        for status in router.health_report():
+            logger.info("Shard %d stopped after %d updates (%d failed)", status["shard"], status["processed"], status["failed"])
@@ -0,0 +1,86 @@
+import asyncio
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class KeyedUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates from different users concurrently and each user's updates in order.
+
+    Game state lives in ``context.user_data``, so updates are keyed by the sending user
+    (or the chat, for updates without one) and each key is processed under its own lock.
+    Locks are taken in arrival order before any other wait, which keeps every key strictly
+    FIFO. At most ``max_concurrent_updates`` handlers run at once. ``max_pending`` bounds
+    how many updates may be admitted in total, including those waiting behind another
+    update for the same user, so one busy user cannot use up the running slots.
+    """
+
+    def __init__(self, max_concurrent_updates, max_pending=None):
+        super().__init__(max_pending or max_concurrent_updates * 16)
+        self.running_limit = max_concurrent_updates
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        # key -> [lock, number of updates holding or waiting for it]
+        self._locks = {}
+        self._stats = {"processed": 0, "running": 0, "peak_running": 0, "waiting": 0, "key_waits": 0}
+
+    @staticmethod
+    def key_for(update):
+        if isinstance(update, Update):
+            if update.effective_user is not None:
+                return ("user", update.effective_user.id)
+            if update.effective_chat is not None:
+                return ("chat", update.effective_chat.id)
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        key = self.key_for(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        lock = entry[0]
+        try:
+            if lock.locked():
+                self._stats["key_waits"] += 1
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def _run(self, coroutine):
+        stats = self._stats
+        stats["waiting"] += 1
+        try:
+            await self._running.acquire()
+        finally:
+            stats["waiting"] -= 1
+        stats["running"] += 1
+        stats["peak_running"] = max(stats["peak_running"], stats["running"])
+        try:
+            await coroutine
+        finally:
+            stats["running"] -= 1
+            stats["processed"] += 1
+            self._running.release()
+
+    def stats(self):
+        """Concurrency limits and counters: admitted and running updates, and keys in flight."""
+        return {
+            "max_concurrent_updates": self.running_limit,
+            "max_pending_updates": self.max_concurrent_updates,
+            "admitted": self.current_concurrent_updates,
+            "active_keys": len(self._locks),
+            **self._stats,
+        }
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
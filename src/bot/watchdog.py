@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from .metrics import REGISTRY, timed
+
+logger = logging.getLogger(__name__)
+
+STALL_THRESHOLD = 0.25
+TICK_INTERVAL = 0.05
+STACK_LIMIT = 25
+
+LOOP_LAG = REGISTRY.histogram(
+    "gamebot_loop_lag_seconds", "How late the event loop ran a timer that should have fired at once",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+STALLS = REGISTRY.counter(
+    "gamebot_loop_stalls_total", "Times the event loop was held longer than the stall threshold, by handler and game",
+    ("handler", "game")
+)
+
+# Handlers decorated with ``metrics.timed`` all run this code object; a frame running it
+# knows which handler (and which game) is on the stack.
+_TIMED_CODE = timed("")(lambda update, context: None).__code__
+
+
+def running_handler(frame):
+    """Return ``(handler, game)`` of the timed handler in the stack ending at ``frame``."""
+    while frame is not None:
+        if frame.f_code is _TIMED_CODE:
+            names = frame.f_locals
+            return names.get("handler", "none"), names.get("game", "none")
+        frame = frame.f_back
+    return "none", "none"
+
+
+class LoopWatchdog:
+    """Notices callbacks that hold the event loop for longer than ``threshold`` seconds.
+
+    A task on the loop records a heartbeat every ``interval`` and how late its timer fired.
+    A thread checks the heartbeat; once it is more than ``threshold`` late, the thread
+    samples the loop thread's stack with ``sys._current_frames`` and logs it with the
+    handler and game being served, while the loop is still stuck. Each stall is logged
+    once, and again with its full length when the loop gets going.
+    """
+
+    def __init__(self, threshold=STALL_THRESHOLD, interval=TICK_INTERVAL, stack_limit=STACK_LIMIT):
+        self.threshold = threshold
+        self.interval = interval
+        self.stack_limit = stack_limit
+        self._beat = time.monotonic()
+        self._loop_thread = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._stalled = False
+        self._stats = {"stalls": 0, "max_lag_seconds": 0.0}
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("Watching for event loop stalls over %.0f ms", self.threshold * 1000)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _tick(self):
+        while True:
+            due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(0.0, now - due)
+            LOOP_LAG.observe(lag)
+            if lag > self._stats["max_lag_seconds"]:
+                self._stats["max_lag_seconds"] = lag
+            if self._stalled:
+                self._stalled = False
+                logger.warning("Event loop was blocked for %.2fs", lag)
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            blocked = time.monotonic() - self._beat - self.interval
+            if blocked > self.threshold and not self._stalled:
+                self._stalled = True
+                self._report(blocked)
+
+    def _report(self, blocked):
+        frame = sys._current_frames().get(self._loop_thread)
+        handler, game = running_handler(frame)
+        STALLS.inc(handler, game)
+        self._stats["stalls"] += 1
+        stack = "".join(traceback.format_stack(frame, self.stack_limit)) if frame is not None else ""
+        logger.warning(
+            "Event loop blocked for %.2fs so far, in handler %s (game %s):\n%s", blocked, handler, game, stack
+        )
+
+    def stats(self):
+        """Stalls seen and the longest loop lag."""
+        return dict(self._stats)
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import signal
+from hmac import compare_digest
+from urllib.parse import urlsplit
+
+from telegram import Update
+
+from .metrics import REGISTRY, stats_families
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 1 << 20
+MAX_HEADER_LINES = 100
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+RESPONSES = {
+    200: b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n",
+    400: b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n",
+    403: b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n",
+    404: b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n",
+    405: b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n",
+    413: b"HTTP/1.1 413 Payload Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n",
+    503: b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nRetry-After: 1\r\n\r\n",
+}
+
+
+class WebhookServer:
+    """Minimal HTTP/1.1 server that receives Telegram webhook updates for an Application.
+
+    Each POST body is put on a bounded intake queue and acknowledged straight away; when
+    the queue is full the server answers 503 so Telegram retries the delivery later.
+    ``workers`` tasks take bodies off the queue, decode them and hand them to the
+    application's update processor, so at most ``workers`` updates are in progress.
+    """
+
+    def __init__(self, application, listen="0.0.0.0", port=8443, path="/", secret_token=None, workers=8, queue_size=1024):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.workers = workers
+        self.intake = asyncio.Queue(maxsize=queue_size)
+        self._server = None
+        self._tasks = []
+        self._stats = {"received": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        # Report the real port when listening on port 0.
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(
+            "Webhook server listening on %s:%d%s with %d workers (intake queue %d)",
+            self.listen, self.port, self.path, self.workers, self.intake.maxsize
+        )
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.intake.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                status, keep_alive = await self._handle_request(reader)
+                if status is None:
+                    break
+                writer.write(RESPONSES[status])
+                await writer.drain()
+                if not keep_alive or status in (400, 413):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader):
+        """Read one request; return the response status (None on a closed connection) and keep-alive."""
+        request_line = await reader.readline()
+        if not request_line:
+            return None, False
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            return 400, False
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            return 400, False
+
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return 400, False
+        if length > MAX_BODY_SIZE:
+            return 413, False
+        body = await reader.readexactly(length) if length else b""
+
+        if urlsplit(target).path != self.path:
+            return 404, keep_alive
+        if method != "POST":
+            return 405, keep_alive
+        if self.secret_token is not None and not compare_digest(headers.get(SECRET_HEADER, ""), self.secret_token):
+            return 403, keep_alive
+        try:
+            self.intake.put_nowait(body)
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            return 503, keep_alive
+        self._stats["received"] += 1
+        return 200, keep_alive
+
+    async def _work(self):
+        while True:
+            body = await self.intake.get()
+            try:
+                await self.process(body)
+                self._stats["processed"] += 1
+            except Exception:
+                self._stats["failed"] += 1
+                logger.exception("Could not process webhook update")
+            finally:
+                self.intake.task_done()
+
+    async def process(self, body):
+        application = self.application
+        update = Update.de_json(json.loads(body), application.bot)
+        await application.update_processor.process_update(update, application.process_update(update))
+
+    def stats(self):
+        """Updates received, rejected with 503, processed and failed, plus the intake queue depth."""
+        return {**self._stats, "queue_depth": self.intake.qsize(), "queue_size": self.intake.maxsize, "workers": self.workers}
+
+
+async def serve_webhook(application, url, listen="0.0.0.0", port=8443, secret_token=None, workers=8, queue_size=1024):
+    """Register ``url`` as the bot's webhook and serve updates until SIGINT or SIGTERM."""
+    server = WebhookServer(application, listen, port, urlsplit(url).path or "/", secret_token, workers, queue_size)
+    REGISTRY.add_collector("webhook", lambda: stats_families("gamebot_webhook", server.stats(), "Webhook intake"))
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.bot.set_webhook(
+            url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES, max_connections=min(100, max(1, workers))
+        )
+        await application.start()
+        await server.start()
+        try:
+            await stop.wait()
+        finally:
+            await server.stop()
+            await application.stop()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
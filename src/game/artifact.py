@@ -0,0 +1,91 @@
+import asyncio
+import mmap
+import os
+import struct
+import threading
+
+
+class ArtifactFormat:
+    """Layout of a cached binary file: a header of magic, format version and ``fields``, then data.
+
+    ``fields`` are further little-endian ``struct`` codes, e.g. counts and bucket starts.
+    """
+
+    def __init__(self, magic, version, fields, description):
+        self.magic = magic
+        self.version = version
+        self.description = description
+        self.header = struct.Struct("<4sI" + fields)
+
+    @property
+    def size(self):
+        return self.header.size
+
+    def write(self, path, fields, chunks):
+        """Write the header with ``fields`` and then ``chunks`` of bytes to ``path``.
+
+        Everything goes to a temporary file first, so processes mapping the old file
+        never see a partial one.
+        """
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as file:
+            file.write(self.header.pack(self.magic, self.version, *fields))
+            for chunk in chunks:
+                file.write(chunk)
+        os.replace(tmp, path)
+
+    def map(self, path):
+        """Memory-map ``path`` read-only; return the map and the header fields after the version."""
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, *fields = self.header.unpack_from(data, 0)
+        if magic != self.magic or version != self.version:
+            raise ValueError(f"{path} is not a {self.description} (version {self.version})")
+        return data, fields
+
+    def is_stale(self, path, fields=(), sources=()):
+        """Return whether ``path`` has to be rebuilt.
+
+        It does if it is missing, if its header is not this format's magic and version
+        followed by ``fields`` (counts that must match the current sources), or if any
+        of ``sources`` was modified after it.
+        """
+        try:
+            with open(path, "rb") as file:
+                data = file.read(self.size)
+            built = os.path.getmtime(path)
+        except FileNotFoundError:
+            return True
+        expected = (self.magic, self.version, *fields)
+        if len(data) < self.size or self.header.unpack(data)[:len(expected)] != expected:
+            return True
+        return any(os.path.exists(source) and os.path.getmtime(source) > built for source in sources)
+
+
+class Shared:
+    """A value created on first use and then shared by every thread of the process."""
+
+    def __init__(self, create):
+        self._create = create
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._create()
+        return self._value
+
+    def ready(self):
+        return self._value is not None
+
+    async def load(self):
+        """``get`` for coroutines.
+
+        Creating the value may mean building a cached file for seconds, so the first
+        call runs in a worker thread and the event loop carries on meanwhile.
+        """
+        if self._value is None:
+            return await asyncio.to_thread(self.get)
+        return self._value
@@ -1,4 +1,19 @@
+from contextlib import contextmanager
+
+
+@contextmanager
+def handling(game, update):
+    """Set ``game.last_update`` while ``update`` is handled; it isn't kept between turns."""
+    game.last_update = update
+    try:
+        yield
+    finally:
+        game.last_update = None
+
+
 class Game:
+    __slots__ = ("name",)
+
     def __init__(self, name):
         self.name = name
 
@@ -1,17 +1,16 @@
 import random
 from telegram import Update
 from telegram.ext import ContextTypes
+from .hangman_index import load_difficulty_index
 
-class HangmanGame:
-    def __init__(self, words):
-        self.words = words
-        self.secret_word = ""
-        self.guessed_letters = set()
-        self.wrong_guesses = set()
-        self.remaining_attempts = 6
-        self.game_over = False
-        self.hangman_stages = [
-            """
+def letter_bit(letter):
+    return 1 << (ord(letter) - ord("a"))
+
+def letters(mask):
+    return "".join(chr(ord("a") + bit) for bit in range(mask.bit_length()) if mask >> bit & 1)
+
+HANGMAN_STAGES = (
+    """
             -----
             |   |
                 |
@@ -20,7 +19,7 @@ class HangmanGame:
                 |
             ========
             """,
-            """
+    """
             -----
             |   |
             O   |
@@ -29,7 +28,7 @@ class HangmanGame:
                 |
             ========
             """,
-            """
+    """
             -----
             |   |
             O   |
@@ -38,7 +37,7 @@ class HangmanGame:
                 |
             ========
             """,
-            """
+    """
             -----
             |   |
             O   |
@@ -47,7 +46,7 @@ class HangmanGame:
                 |
             ========
             """,
-            """
+    """
             -----
             |   |
             O   |
@@ -56,7 +55,7 @@ class HangmanGame:
                 |
             ========
             """,
-            """
+    """
             -----
             |   |
             O   |
@@ -65,7 +64,7 @@ class HangmanGame:
                 |
             ========
             """,
-            """
+    """
             -----
             |   |
             O   |
@@ -74,12 +73,48 @@ class HangmanGame:
                 |
             ========
             """
-        ]
+)
+
+class HangmanGame:
+    # Guessed letters are kept as bitmasks (bit 0 is "a") rather than sets.
+    __slots__ = ("words", "difficulty", "secret_word", "guessed_mask", "wrong_mask", "remaining_attempts", "game_over")
+
+    def __init__(self, words, difficulty=None):
+        self.words = words
+        self.difficulty = difficulty
+        self.secret_word = ""
+        self.guessed_mask = 0
+        self.wrong_mask = 0
+        self.remaining_attempts = 6
+        self.game_over = False
+
+    def to_record(self):
+        return {
+            "word": self.secret_word,
+            "difficulty": self.difficulty,
+            "guessed": letters(self.guessed_mask),
+            "wrong": letters(self.wrong_mask),
+            "remaining": self.remaining_attempts,
+        }
+
+    @classmethod
+    def from_record(cls, record, words):
+        game = cls(words, record["difficulty"])
+        game.secret_word = record["word"]
+        for letter in record["guessed"]:
+            game.guessed_mask |= letter_bit(letter)
+        for letter in record["wrong"]:
+            game.wrong_mask |= letter_bit(letter)
+        game.remaining_attempts = record["remaining"]
+        return game
 
     async def start_game(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        self.secret_word = random.choice(self.words).lower()
-        self.guessed_letters = set()
-        self.wrong_guesses = set()
+        if self.difficulty:
+            self.secret_word = (await load_difficulty_index()).draw(self.difficulty)
+        else:
+            self.secret_word = random.choice(self.words).lower()
+        self.guessed_mask = 0
+        self.wrong_mask = 0
         self.remaining_attempts = 6
         self.game_over = False
 
@@ -96,13 +131,13 @@ class HangmanGame:
 
     def _get_display_word(self):
         return " ".join(
-            letter if letter in self.guessed_letters else "▯" 
+            letter if self.guessed_mask & letter_bit(letter) else "▯" 
             for letter in self.secret_word
         )
 
     def _get_hangman_display(self):
         stage = 6 - self.remaining_attempts
-        return f"```{self.hangman_stages[stage]}```"
+        return f"```{HANGMAN_STAGES[stage]}```"
 
     async def _send_message(self, update, text):
         if update.message:
@@ -125,22 +160,23 @@ class HangmanGame:
         await self._send_message(update, response)
 
     async def _handle_letter_guess(self, letter, context):
-        if letter in self.guessed_letters or letter in self.wrong_guesses:
+        bit = letter_bit(letter)
+        if (self.guessed_mask | self.wrong_mask) & bit:
             return f"You already guessed '{letter}'!"
             
         if letter in self.secret_word:
-            self.guessed_letters.add(letter)
+            self.guessed_mask |= bit
             response = (
                 f"✅ *Correct!* '{letter}' is in the word.\n"
                 f"{self._get_display_word()}\n"
                 f"{self._get_hangman_display()}"
             )
         else:
-            self.wrong_guesses.add(letter)
+            self.wrong_mask |= bit
             self.remaining_attempts -= 1
             response = (
                 f"❌ *Wrong!* '{letter}' is not in the word.\n"
-                f"Wrong guesses: {', '.join(sorted(self.wrong_guesses))}\n"
+                f"Wrong guesses: {', '.join(letters(self.wrong_mask))}\n"
                 f"{self._get_display_word()}\n"
                 f"{self._get_hangman_display()}"
             )
@@ -150,7 +186,7 @@ class HangmanGame:
             context.user_data["current_game"] = None
             return (
                 f"🎉 *You won!* The word was: *{self.secret_word}*\n"
-                f"Wrong guesses: {len(self.wrong_guesses)}\n"
+                f"Wrong guesses: {self.wrong_mask.bit_count()}\n"
                 f"{self._get_hangman_display()}"
             )
             
@@ -186,4 +222,4 @@ class HangmanGame:
         )
 
     def _check_win(self):
-        return all(letter in self.guessed_letters for letter in self.secret_word)
+        return all(self.guessed_mask & letter_bit(letter) for letter in self.secret_word)
@@ -0,0 +1,149 @@
+import logging
+import os
+import random
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from .artifact import ArtifactFormat, Shared
+from .lexicon import get_lexicon
+
+logger = logging.getLogger(__name__)
+
+WORDS_FILE = "common-words.txt"
+INDEX_FILE = "hangman-difficulty.bin"
+
+DIFFICULTIES = ("easy", "medium", "hard")
+# A word's difficulty is the number of wrong guesses a letter-frequency solver makes on it.
+EASY_MAX_MISSES = 1
+MEDIUM_MAX_MISSES = 3
+
+# Index layout: header (magic, version, word count, start of the medium and hard buckets),
+# then one uint8 miss count per lexicon word, then the lexicon indexes (uint32) grouped
+# easy, medium, hard.
+FORMAT = ArtifactFormat(b"GBHI", 1, "III", "Hangman difficulty index")
+
+
+def _simulate(words, guessed, misses, scores):
+    """Record in ``scores`` the misses the frequency solver makes on each of ``words``.
+
+    All words share length and are consistent with the guesses so far, so the solver's
+    next letter is the same for every one of them; the group is split by where that
+    letter appears and each part is solved recursively. Every word is visited once per
+    guess, instead of re-filtering the whole word list for each simulated game.
+    """
+    if len(words) == 1:
+        scores[words[0]] = misses
+        return
+
+    frequency = {}
+    for word in words:
+        for letter in set(word):
+            if letter not in guessed:
+                frequency[letter] = frequency.get(letter, 0) + 1
+    letter = min(frequency, key=lambda candidate: (-frequency[candidate], candidate))
+
+    groups = {}
+    for word in words:
+        pattern = tuple(i for i, char in enumerate(word) if char == letter)
+        groups.setdefault(pattern, []).append(word)
+
+    guessed = guessed | {letter}
+    for pattern, group in groups.items():
+        _simulate(group, guessed, misses + (not pattern), scores)
+
+
+def _score_group(words):
+    scores = {}
+    _simulate(words, frozenset(), 0, scores)
+    return scores
+
+
+def difficulty_of(misses):
+    if misses <= EASY_MAX_MISSES:
+        return "easy"
+    if misses <= MEDIUM_MAX_MISSES:
+        return "medium"
+    return "hard"
+
+
+def build_difficulty_index(path=INDEX_FILE, workers=None):
+    """Simulate the solver against every word and write the graded index to ``path``."""
+    lexicon = get_lexicon(WORDS_FILE)
+    words = list(lexicon)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    by_length = {}
+    for word in words:
+        by_length.setdefault(len(word), []).append(word)
+    groups = sorted(by_length.values(), key=len, reverse=True)
+
+    scores = {}
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            for group_scores in executor.map(_score_group, groups):
+                scores.update(group_scores)
+    else:
+        for group in groups:
+            scores.update(_score_group(group))
+
+    misses = array("B", (min(scores[word], 255) for word in words))
+    buckets = {difficulty: array("I") for difficulty in DIFFICULTIES}
+    for index, count in enumerate(misses):
+        buckets[difficulty_of(count)].append(index)
+    medium_start = len(buckets["easy"])
+    hard_start = medium_start + len(buckets["medium"])
+
+    if sys.byteorder != "little":
+        for bucket in buckets.values():
+            bucket.byteswap()
+    chunks = [misses.tobytes()] + [buckets[difficulty].tobytes() for difficulty in DIFFICULTIES]
+    FORMAT.write(path, (len(words), medium_start, hard_start), chunks)
+    logger.info(
+        "Built Hangman difficulty index %s (%d easy, %d medium, %d hard) in %.1fs",
+        path, medium_start, hard_start - medium_start, len(words) - hard_start, time.perf_counter() - start
+    )
+    return path
+
+
+class DifficultyIndex:
+    """Memory-mapped Hangman words graded by difficulty; draws are O(1)."""
+
+    def __init__(self, path=INDEX_FILE):
+        self.words = get_lexicon(WORDS_FILE)
+        self._mmap, (count, medium_start, hard_start) = FORMAT.map(path)
+        if count != len(self.words):
+            raise ValueError(f"{path} does not match {WORDS_FILE}")
+
+        self._misses = FORMAT.size
+        self._buckets = FORMAT.size + count
+        self.buckets = {
+            "easy": (0, medium_start),
+            "medium": (medium_start, hard_start),
+            "hard": (hard_start, count),
+        }
+
+    def misses(self, word):
+        """Wrong guesses the frequency solver needs for ``word``, or None if it is not indexed."""
+        index = self.words.index(word)
+        return self._mmap[self._misses + index] if index >= 0 else None
+
+    def draw(self, difficulty):
+        start, stop = self.buckets[difficulty]
+        if start == stop:
+            return random.choice(self.words)
+        position = self._buckets + 4 * random.randrange(start, stop)
+        return self.words[int.from_bytes(self._mmap[position:position + 4], "little")]
+
+
+def _open_index():
+    if FORMAT.is_stale(INDEX_FILE, (len(get_lexicon(WORDS_FILE)),), (WORDS_FILE,)):
+        build_difficulty_index(INDEX_FILE)
+    return DifficultyIndex(INDEX_FILE)
+
+
+_index = Shared(_open_index)
+get_difficulty_index = _index.get
+load_difficulty_index = _index.load
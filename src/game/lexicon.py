@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+from .artifact import ArtifactFormat
+
+logger = logging.getLogger(__name__)
+
+# Compiled lexicon layout (all integers little-endian uint32):
+#   header   magic, version, word count, blob size, hash table size
+#   offsets  count + 1 byte offsets into the blob
+#   table    open-addressing hash table of word index + 1 (0 = empty slot), keyed by crc32
+#   blob     the words, utf-8 encoded, sorted and concatenated
+FORMAT = ArtifactFormat(b"GBLX", 2, "III", "compiled lexicon")
+COMPILED_SUFFIX = ".lex"
+
+
+def compiled_path(filename):
+    return os.path.splitext(filename)[0] + COMPILED_SUFFIX
+
+
+def read_source_words(filename):
+    """Read a word file (one word per line, or a JSON list) into sorted, unique words."""
+    with open(filename, "r") as file:
+        if filename.endswith(".json"):
+            raw = json.load(file)
+        else:
+            raw = file.readlines()
+
+    words = {word.strip().lower() for word in raw}
+    words.discard("")
+    return sorted(words, key=lambda word: word.encode("utf-8"))
+
+
+def compile_lexicon(source, target=None):
+    """Compile ``source`` into the binary lexicon format and return the target path."""
+    target = target or compiled_path(source)
+    encoded = [word.encode("utf-8") for word in read_source_words(source)]
+
+    offsets = array("I", [0])
+    total = 0
+    for word in encoded:
+        total += len(word)
+        offsets.append(total)
+
+    table_size = 1
+    while table_size < 2 * len(encoded):
+        table_size *= 2
+    table = array("I", bytes(4 * table_size))
+    mask = table_size - 1
+    for index, word in enumerate(encoded):
+        slot = zlib.crc32(word) & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = index + 1
+
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        table.byteswap()
+
+    FORMAT.write(target, (len(encoded), total, table_size), [offsets.tobytes(), table.tobytes(), b"".join(encoded)])
+    return target
+
+
+class Lexicon:
+    """Immutable, memory-mapped word list shared by every game in the process.
+
+    Membership goes through the compiled hash table. Words are stored sorted,
+    so every word sharing a prefix occupies a contiguous index range.
+    """
+
+    def __init__(self, name, path, load_time=0.0):
+        self.name = name
+        self.path = path
+        self.load_time = load_time
+
+        self._mmap, (count, blob_size, table_size) = FORMAT.map(path)
+
+        offsets_start = FORMAT.size
+        table_start = offsets_start + 4 * (count + 1)
+        blob_start = table_start + 4 * table_size
+        self._offsets = self._uint32_view(offsets_start, table_start)
+        self._table = self._uint32_view(table_start, blob_start)
+        self._mask = table_size - 1
+        self._blob_start = blob_start
+        self._count = count
+        self._prefix_ranges = {}
+
+    def _uint32_view(self, start, end):
+        if sys.byteorder == "little":
+            return memoryview(self._mmap)[start:end].cast("I")
+        values = array("I", self._mmap[start:end])
+        values.byteswap()
+        return values
+
+    def _entry(self, index):
+        base = self._blob_start
+        return self._mmap[base + self._offsets[index]:base + self._offsets[index + 1]]
+
+    def _bisect(self, key):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def index(self, word):
+        """Return the position of ``word`` in the lexicon, or -1 if it is missing."""
+        key = word.encode("utf-8")
+        table = self._table
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            entry = table[slot]
+            if not entry:
+                return -1
+            if self._entry(entry - 1) == key:
+                return entry - 1
+            slot = (slot + 1) & self._mask
+
+    def prefix_range(self, prefix):
+        """Return the ``(start, stop)`` index range of words starting with ``prefix``."""
+        bounds = self._prefix_ranges.get(prefix)
+        if bounds is None:
+            key = prefix.encode("utf-8")
+            bounds = (self._bisect(key), self._bisect(key + b"\xff"))
+            self._prefix_ranges[prefix] = bounds
+        return bounds
+
+    def __contains__(self, word):
+        return isinstance(word, str) and self.index(word) >= 0
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self._entry(index).decode("utf-8")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("lexicon index out of range")
+        return self._entry(index).decode("utf-8")
+
+    def size_bytes(self):
+        """Size of the mapped file; its pages are shared with every other process mapping it."""
+        return len(self._mmap)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "words": len(self),
+            "load_time": self.load_time,
+            "size_bytes": self.size_bytes(),
+        }
+
+
+_lexicons = {}
+_lock = threading.Lock()
+
+
+def get_lexicon(filename):
+    """Return the shared lexicon for ``filename``, compiling and mapping it on first use."""
+    lexicon = _lexicons.get(filename)
+    if lexicon is not None:
+        return lexicon
+
+    with _lock:
+        lexicon = _lexicons.get(filename)
+        if lexicon is None:
+            start = time.perf_counter()
+            target = compiled_path(filename)
+            if FORMAT.is_stale(target, sources=(filename,)):
+                logger.info("Compiling lexicon %s -> %s", filename, target)
+                compile_lexicon(filename, target)
+            lexicon = Lexicon(filename, target, time.perf_counter() - start)
+            _lexicons[filename] = lexicon
+            logger.info(
+                "Loaded lexicon %s: %d words in %.3fs (%.1f MB mapped)",
+                filename, len(lexicon), lexicon.load_time, lexicon.size_bytes() / 1e6
+            )
+    return lexicon
+
+
+def preload(*filenames):
+    for filename in filenames:
+        get_lexicon(filename)
+
+
+def resident_sizes():
+    """Map each file mapped by this process to its resident bytes, from /proc/self/smaps.
+
+    Empty where smaps is unavailable (outside Linux).
+    """
+    sizes = {}
+    try:
+        with open("/proc/self/smaps") as file:
+            path = None
+            for line in file:
+                fields = line.split()
+                if not fields[0].endswith(":"):
+                    # A mapping's first line: address range, flags, offset, device, inode and path.
+                    path = fields[5] if len(fields) > 5 else None
+                elif fields[0] == "Rss:" and path is not None:
+                    sizes[path] = sizes.get(path, 0) + int(fields[1]) * 1024
+    except OSError:
+        pass
+    return sizes
+
+
+def lexicon_stats():
+    """Words, load time, mapped size and resident size of every loaded lexicon."""
+    resident = resident_sizes()
+    return [
+        dict(lexicon.stats(), resident_bytes=resident.get(os.path.realpath(lexicon.path)))
+        for lexicon in _lexicons.values()
+    ]
@@ -0,0 +1,170 @@
+import itertools
+import logging
+import os
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+
+from .artifact import ArtifactFormat, Shared
+from .math_expr import format_operation
+
+logger = logging.getLogger(__name__)
+
+BANK_FILE = "math-puzzles.bin"
+NUMBER_RANGE = range(1, 16)
+NUMBER_COUNT = 4
+TARGET_LIMIT = 100
+
+# Postfix expression tokens: 1-15 are numbers, these are the operators.
+ADD, SUB, MUL, DIV = 16, 17, 18, 19
+OPERATORS = {ADD: "+", SUB: "-", MUL: "*", DIV: "/"}
+
+DIFFICULTIES = ("easy", "medium", "hard")
+# A puzzle's difficulty is graded by how many ways there are to reach its target.
+HARD_MAX_SOLUTIONS = 2
+MEDIUM_MAX_SOLUTIONS = 9
+
+# Bank layout: header (magic, version, record count, start index of the medium and hard
+# buckets), then fixed-size records sorted easy, medium, hard. Each record is the target,
+# the number of solutions and the canonical solution as 7 postfix tokens.
+FORMAT = ArtifactFormat(b"GBMB", 1, "III", "math puzzle bank")
+RECORD = struct.Struct("<bH7s")
+
+
+def _reachable(numbers, cache):
+    """Map every value reachable from the sorted tuple ``numbers`` to [postfix, derivation count]."""
+    values = cache.get(numbers)
+    if values is not None:
+        return values
+
+    if len(numbers) == 1:
+        values = {Fraction(numbers[0]): [bytes(numbers), 1]}
+        cache[numbers] = values
+        return values
+
+    values = {}
+    splits = set()
+    for mask in range(1, (1 << len(numbers)) - 1):
+        left = tuple(n for i, n in enumerate(numbers) if mask >> i & 1)
+        right = tuple(n for i, n in enumerate(numbers) if not mask >> i & 1)
+        if (right, left) in splits:
+            continue
+        splits.add((left, right))
+
+        for a, (postfix_a, ways_a) in _reachable(left, cache).items():
+            for b, (postfix_b, ways_b) in _reachable(right, cache).items():
+                ways = ways_a * ways_b
+                results = [
+                    (a + b, postfix_a + postfix_b + bytes([ADD])),
+                    (a * b, postfix_a + postfix_b + bytes([MUL])),
+                    (a - b, postfix_a + postfix_b + bytes([SUB])),
+                    (b - a, postfix_b + postfix_a + bytes([SUB])),
+                ]
+                if b:
+                    results.append((a / b, postfix_a + postfix_b + bytes([DIV])))
+                if a:
+                    results.append((b / a, postfix_b + postfix_a + bytes([DIV])))
+
+                for value, postfix in results:
+                    entry = values.get(value)
+                    if entry is None:
+                        values[value] = [postfix, ways]
+                    else:
+                        entry[1] += ways
+
+    cache[numbers] = values
+    return values
+
+
+def _puzzles(multisets):
+    cache = {}
+    puzzles = []
+    for numbers in multisets:
+        for value, (postfix, ways) in _reachable(numbers, cache).items():
+            if value.denominator == 1 and value and abs(value) <= TARGET_LIMIT:
+                puzzles.append((int(value), min(ways, 0xFFFF), postfix))
+    return puzzles
+
+
+def difficulty_of(solutions):
+    if solutions <= HARD_MAX_SOLUTIONS:
+        return "hard"
+    if solutions <= MEDIUM_MAX_SOLUTIONS:
+        return "medium"
+    return "easy"
+
+
+def build_puzzle_bank(path=BANK_FILE, workers=None):
+    """Enumerate every 4-number multiset and its reachable integer targets into ``path``."""
+    multisets = list(itertools.combinations_with_replacement(NUMBER_RANGE, NUMBER_COUNT))
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if workers > 1:
+        chunks = [multisets[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(workers) as executor:
+            puzzles = [puzzle for chunk in executor.map(_puzzles, chunks) for puzzle in chunk]
+    else:
+        puzzles = _puzzles(multisets)
+
+    buckets = {difficulty: [] for difficulty in DIFFICULTIES}
+    for puzzle in puzzles:
+        buckets[difficulty_of(puzzle[1])].append(puzzle)
+    medium_start = len(buckets["easy"])
+    hard_start = medium_start + len(buckets["medium"])
+
+    records = (RECORD.pack(*puzzle) for difficulty in DIFFICULTIES for puzzle in buckets[difficulty])
+    FORMAT.write(path, (len(puzzles), medium_start, hard_start), records)
+    logger.info("Built math puzzle bank %s (%d puzzles) in %.1fs", path, len(puzzles), time.perf_counter() - start)
+    return path
+
+
+def postfix_to_infix(postfix):
+    stack = []
+    for token in postfix:
+        if token in OPERATORS:
+            right, left = stack.pop(), stack.pop()
+            stack.append(format_operation(left, OPERATORS[token], right))
+        else:
+            stack.append(str(token))
+    return stack[0]
+
+
+class PuzzleBank:
+    """Memory-mapped bank of every 4-number puzzle; draws are O(1)."""
+
+    def __init__(self, path=BANK_FILE):
+        self._mmap, (count, medium_start, hard_start) = FORMAT.map(path)
+        self.buckets = {
+            "easy": (0, medium_start),
+            "medium": (medium_start, hard_start),
+            "hard": (hard_start, count),
+        }
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def puzzle(self, index):
+        """Return ``(target, numbers, solution, solution_count)`` for record ``index``."""
+        target, solutions, postfix = RECORD.unpack_from(self._mmap, FORMAT.size + index * RECORD.size)
+        numbers = [token for token in postfix if token not in OPERATORS]
+        return target, numbers, postfix_to_infix(postfix), solutions
+
+    def draw(self, difficulty=None):
+        start, stop = self.buckets[difficulty] if difficulty else (0, self.count)
+        return self.puzzle(random.randrange(start, stop))
+
+
+def _open_bank():
+    # The bank is generated by this module alone.
+    if FORMAT.is_stale(BANK_FILE, sources=(__file__,)):
+        build_puzzle_bank(BANK_FILE)
+    return PuzzleBank(BANK_FILE)
+
+
+_bank = Shared(_open_bank)
+get_puzzle_bank = _bank.get
+load_puzzle_bank = _bank.load
@@ -0,0 +1,138 @@
+import re
+from fractions import Fraction
+from functools import lru_cache
+
+MAX_LENGTH = 200
+MAX_OPERATORS = 20
+MAX_DEPTH = 10
+MAX_LITERAL_DIGITS = 4
+
+NEGATE = "neg"
+PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, NEGATE: 3}
+_TOKEN = re.compile(r"[0-9]+|\S")
+
+
+class ExpressionError(ValueError):
+    """Raised for input that is not an allowed arithmetic expression; the message is user-facing."""
+
+
+class CompiledExpression:
+    """A parsed arithmetic expression: a postfix program plus the numbers it uses."""
+
+    def __init__(self, program, numbers):
+        self.program = program
+        self.numbers = numbers
+        self._value = None
+
+    def evaluate(self):
+        """Evaluate exactly, returning an int or a Fraction. Raises ZeroDivisionError on division by zero.
+
+        Arithmetic stays on plain ints until a division leaves a remainder, then uses Fraction.
+        """
+        if self._value is not None:
+            return self._value
+
+        stack = []
+        for step in self.program:
+            if step.__class__ is int:
+                stack.append(step)
+            elif step == NEGATE:
+                stack.append(-stack.pop())
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                if step == "+":
+                    stack.append(left + right)
+                elif step == "-":
+                    stack.append(left - right)
+                elif step == "*":
+                    stack.append(left * right)
+                elif right == 0:
+                    raise ZeroDivisionError("division by zero")
+                elif left.__class__ is int and right.__class__ is int and left % right == 0:
+                    stack.append(left // right)
+                else:
+                    stack.append(Fraction(left, right))
+        self._value = stack[0]
+        return self._value
+
+
+def format_operation(left, operator, right):
+    """Join two formatted operands, parenthesizing any that are not a single number."""
+    if " " in left:
+        left = f"({left})"
+    if " " in right:
+        right = f"({right})"
+    return f"{left} {operator} {right}"
+
+
+def _invalid():
+    return ExpressionError("❌ Invalid mathematical expression.")
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(text):
+    """Parse ``text`` into a CompiledExpression in one pass, enforcing size limits. Results are cached."""
+    if len(text) > MAX_LENGTH:
+        raise ExpressionError("❌ Expression is too long.")
+
+    program = []
+    numbers = []
+    pending = []
+    depth = 0
+    operators = 0
+    expect_operand = True
+
+    for token in _TOKEN.findall(text):
+        if token[0] in "0123456789":
+            if not expect_operand:
+                raise _invalid()
+            if len(token) > MAX_LITERAL_DIGITS:
+                raise ExpressionError(f"❌ Numbers can have at most {MAX_LITERAL_DIGITS} digits.")
+            value = int(token)
+            program.append(value)
+            numbers.append(value)
+            expect_operand = False
+        elif token == "(":
+            if not expect_operand:
+                raise _invalid()
+            depth += 1
+            if depth > MAX_DEPTH:
+                raise ExpressionError("❌ Expression is nested too deeply.")
+            pending.append(token)
+        elif token == ")":
+            if expect_operand:
+                raise _invalid()
+            while pending and pending[-1] != "(":
+                program.append(pending.pop())
+            if not pending:
+                raise _invalid()
+            pending.pop()
+            depth -= 1
+        elif token in PRECEDENCE:
+            operators += 1
+            if operators > MAX_OPERATORS:
+                raise ExpressionError("❌ Too many operators.")
+            if expect_operand:
+                # Unary sign: "-" binds tighter than any binary operator, "+" is a no-op.
+                if token == "-":
+                    pending.append(NEGATE)
+                elif token != "+":
+                    raise _invalid()
+                continue
+            precedence = PRECEDENCE[token]
+            while pending and pending[-1] != "(" and PRECEDENCE[pending[-1]] >= precedence:
+                program.append(pending.pop())
+            pending.append(token)
+            expect_operand = True
+        else:
+            raise ExpressionError("Only numbers, +, -, *, /, and parentheses are allowed.")
+
+    if expect_operand:
+        raise _invalid()
+    while pending:
+        operator = pending.pop()
+        if operator == "(":
+            raise _invalid()
+        program.append(operator)
+    return CompiledExpression(tuple(program), tuple(numbers))
@@ -0,0 +1,116 @@
+from fractions import Fraction
+from functools import lru_cache
+
+from .math_expr import format_operation
+
+
+def _divide(a, b):
+    if a.__class__ is int and b.__class__ is int and a % b == 0:
+        return a // b
+    return Fraction(a, b)
+
+
+def _splits(numbers):
+    """Yield each way to split the sorted tuple ``numbers`` into two non-empty sub-multisets once."""
+    seen = set()
+    for mask in range(1, (1 << len(numbers)) - 1):
+        left = tuple(n for i, n in enumerate(numbers) if mask >> i & 1)
+        right = tuple(n for i, n in enumerate(numbers) if not mask >> i & 1)
+        if (right, left) not in seen and (left, right) not in seen:
+            seen.add((left, right))
+            yield left, right
+
+
+class MultisetSolver:
+    """Finds every expression over one number multiset, memoized by sub-multiset.
+
+    ``values`` holds the reachable values of each proper sub-multiset; expressions are
+    then built target-first, so the full multiset's value set is never enumerated.
+    Expressions are distinct up to commutativity of + and *.
+    """
+
+    def __init__(self, numbers):
+        self.numbers = tuple(sorted(numbers))
+        self._values = {}
+        self._expressions = {}
+
+    def values(self, numbers):
+        values = self._values.get(numbers)
+        if values is not None:
+            return values
+
+        if len(numbers) == 1:
+            values = {numbers[0]}
+        else:
+            values = set()
+            for left, right in _splits(numbers):
+                right_values = self.values(right)
+                for a in self.values(left):
+                    for b in right_values:
+                        values.update((a + b, a * b, a - b, b - a))
+                        if b:
+                            values.add(_divide(a, b))
+                        if a:
+                            values.add(_divide(b, a))
+        self._values[numbers] = values
+        return values
+
+    def expressions(self, numbers, target, limit=None):
+        key = (numbers, target, limit)
+        found = self._expressions.get(key)
+        if found is not None:
+            return found
+
+        found = set()
+        if len(numbers) == 1:
+            if numbers[0] == target:
+                found.add(str(numbers[0]))
+            self._expressions[key] = found
+            return found
+
+        for left, right in _splits(numbers):
+            right_values = self.values(right)
+            for a in self.values(left):
+                # For each operator, the value the right-hand side needs, and how to format it.
+                needed = [(target - a, "+", False), (a - target, "-", False), (a + target, "-", True)]
+                if a:
+                    needed.append((_divide(target, a), "*", False))
+                    needed.append((a * target, "/", True))
+                if target:
+                    if a:
+                        needed.append((_divide(a, target), "/", False))
+                elif not a:
+                    # 0 * b and 0 / b are 0 for any (non-zero) b.
+                    needed.extend((b, "*", False) for b in right_values)
+                    needed.extend((b, "/", False) for b in right_values if b)
+
+                for b, operator, swapped in needed:
+                    if b not in right_values:
+                        continue
+                    for left_expression in self.expressions(left, a, limit):
+                        for right_expression in self.expressions(right, b, limit):
+                            first, second = left_expression, right_expression
+                            if swapped or (operator in "+*" and second < first):
+                                first, second = second, first
+                            found.add(format_operation(first, operator, second))
+                            if limit and len(found) >= limit:
+                                self._expressions[key] = found
+                                return found
+
+        self._expressions[key] = found
+        return found
+
+    def solutions(self, target, limit=None):
+        """Return the expressions using every number once that evaluate to ``target``, shortest first."""
+        found = self.expressions(self.numbers, target, limit)
+        return sorted(found, key=lambda expression: (len(expression), expression))
+
+
+@lru_cache(maxsize=256)
+def get_solver(numbers):
+    """Return the memoized solver for a sorted tuple of numbers; recently used multisets stay cached."""
+    return MultisetSolver(numbers)
+
+
+def solve(numbers, target, limit=None):
+    return get_solver(tuple(sorted(numbers))).solutions(target, limit)
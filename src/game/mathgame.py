@@ -1,28 +1,59 @@
+import asyncio
 import random
-import re
+from fractions import Fraction
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
+from telegram.helpers import escape_markdown
+from .game import handling
+from .math_bank import DIFFICULTIES, NUMBER_RANGE, TARGET_LIMIT, get_puzzle_bank, load_puzzle_bank
+from .math_expr import ExpressionError, compile_expression, format_operation
+from .math_solver import solve
+
+# The bank covers 4-number puzzles; larger modes build a random expression and solve on demand.
+NUMBER_COUNTS = {"5 numbers": 5, "6 numbers": 6}
+MODES = DIFFICULTIES + tuple(NUMBER_COUNTS)
+SOLUTION_LIMIT = 50
+SOLUTIONS_SHOWN = 5
 
 class MathGame:
-    def __init__(self):
+    __slots__ = ("goal", "difficulty", "current_numbers", "name", "game_over", "last_update", "computer_solution")
+
+    def __init__(self, difficulty=None):
         self.goal = 0
-        self.usable_operators = ["+", "-", "*", "/"]
-        self.current_numbers = []
+        self.difficulty = difficulty
+        self.current_numbers = ()
         self.name = "Math Challenge"
         self.game_over = False
         self.last_update = None
         self.computer_solution = ""
         
+    def to_record(self):
+        return {
+            "difficulty": self.difficulty,
+            "goal": self.goal,
+            "numbers": list(self.current_numbers),
+            "solution": self.computer_solution,
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        game = cls(record["difficulty"])
+        game.goal = record["goal"]
+        game.current_numbers = tuple(record["numbers"])
+        game.computer_solution = record["solution"]
+        return game
+
     async def start_game(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        self.last_update = update
-        await self.new_round(update, context)
+        with handling(self, update):
+            await self.new_round(update, context)
         
     async def new_round(self, update: Update, context: ContextTypes.DEFAULT_TYPE, last_response: str = None):
         self.game_over = False
+        await load_puzzle_bank()
         goal, numbers, computer_solution = self._generate_data()
         self.goal = goal
-        self.current_numbers = numbers
+        self.current_numbers = tuple(numbers)
         self.computer_solution = computer_solution
         context.user_data["current_game"] = self
         
@@ -38,72 +69,62 @@ class MathGame:
         )
         
         if last_response:
-            await self._send_message(update, last_response)
-            
+            # Solutions are full of "*"; sent on its own, this fell back to plain text.
+            start_message = f"{escape_markdown(last_response)}\n\n{start_message}"
+
         await self._send_message(update, start_message)
 
     def _generate_data(self):
+        count = NUMBER_COUNTS.get(self.difficulty)
+        if count is not None:
+            return self._generate_large(count)
+
+        goal, numbers, computer_sol, _ = get_puzzle_bank().draw(self.difficulty)
+        random.shuffle(numbers)
+        self.goal = goal
+        self.current_numbers = numbers
+        return self.goal, self.current_numbers, computer_sol
+
+    def _generate_large(self, count):
         while True:
-            self.current_numbers = [random.randint(1, 15) for _ in range(4)]
-            operators = [random.choice(self.usable_operators) for _ in range(3)]
-            
-            structures = [
-                "((a {op1} b) {op2} c) {op3} d",
-                "(a {op1} (b {op2} c)) {op3} d",
-                "a {op1} ((b {op2} c) {op3} d)",
-                "(a {op1} b) {op2} (c {op3} d)"
-            ]
-            
-            random.shuffle(structures)
-            
-            for structure in structures:
-                expression = structure.format(
-                    op1=operators[0],
-                    op2=operators[1],
-                    op3=operators[2]
-                )
-                
-                try:
-                    a, b, c, d = self.current_numbers
-                    result = eval(expression)
-                    
-                    if isinstance(result, float):
-                        if not result.is_integer() or abs(result) > 100:
-                            continue
-                        result = int(result)
-                    
-                    if -100 <= result <= 100 and result != 0:
-                        self.goal = result
-                        computer_sol = expression.replace("a", str(a)).replace("b", str(b))\
-                                                .replace("c", str(c)).replace("d", str(d))
-                        return self.goal, self.current_numbers, computer_sol
-                        
-                except ZeroDivisionError:
-                    continue
+            numbers = [random.choice(NUMBER_RANGE) for _ in range(count)]
+            terms = [(number, str(number)) for number in numbers]
+            while len(terms) > 1:
+                (a, left), (b, right) = terms.pop(random.randrange(len(terms))), terms.pop(random.randrange(len(terms)))
+                operator = random.choice("+-*/")
+                if operator == "/" and b == 0:
+                    operator = "*"
+                value = a + b if operator == "+" else a - b if operator == "-" else a * b if operator == "*" else Fraction(a, b)
+                terms.append((value, format_operation(left, operator, right)))
+
+            goal, computer_sol = terms[0]
+            if goal == int(goal) and goal and abs(goal) <= TARGET_LIMIT:
+                self.goal = int(goal)
+                self.current_numbers = numbers
+                return self.goal, self.current_numbers, computer_sol
         
     def _verify_solution(self, user_input):
-        input_numbers = [int(num) for num in re.findall(r'\d+', user_input)]
-        if sorted(input_numbers) != sorted(self.current_numbers):
-            return False, "You must use exactly the provided numbers."
+        try:
+            expression = compile_expression(user_input)
+        except ExpressionError as e:
+            return False, str(e)
 
-        if not re.fullmatch(r'^[\d+\-*/(). $]+$', user_input):
-            return False, "Only numbers, +, -, *, /, $, and parentheses are allowed."
+        if sorted(expression.numbers) != sorted(self.current_numbers):
+            return False, "You must use exactly the provided numbers."
 
         try:
-            result = eval(user_input)
-            if isinstance(result, float):
-                if not result.is_integer():
-                    return False, "Result must be a whole number."
-                result = int(result)
-            
-            if result == self.goal:
-                return True, f"✅ Correct! The computer's solution was: {self.computer_solution} = {self.goal}"
-            else:
-                return False, f"❌ Incorrect. Your solution equals {result}, but the target is {self.goal}."
+            result = expression.evaluate()
         except ZeroDivisionError:
             return False, "❌ Division by zero is not allowed."
-        except:
-            return False, "❌ Invalid mathematical expression."
+
+        if result.denominator != 1:
+            return False, "Result must be a whole number."
+        result = int(result)
+
+        if result == self.goal:
+            return True, f"✅ Correct! The computer's solution was: {self.computer_solution} = {self.goal}"
+        else:
+            return False, f"❌ Incorrect. Your solution equals {result}, but the target is {self.goal}."
 
     async def check_guess(self, player_guess: str, context: ContextTypes.DEFAULT_TYPE):
         player_guess = player_guess.strip()
@@ -124,10 +145,20 @@ class MathGame:
 
     async def show_solution(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if self.computer_solution:
+            # Solving 5 and 6 numbers can take a moment; keep it off the event loop.
+            solutions = await asyncio.to_thread(solve, self.current_numbers, self.goal, SOLUTION_LIMIT)
+            if len(solutions) >= SOLUTION_LIMIT:
+                found = f"There are at least {SOLUTION_LIMIT} ways"
+            elif len(solutions) == 1:
+                found = "There is 1 way"
+            else:
+                found = f"There are {len(solutions)} ways"
             solution_message = (
                 f"💡 The solution was:\n"
                 f"{self.computer_solution} = {self.goal}\n\n"
-                "Starting a new challenge..."
+                f"{found} to reach {self.goal}, for example:\n"
+                + "\n".join(solutions[:SOLUTIONS_SHOWN])
+                + "\n\nStarting a new challenge..."
             )
             await self.new_round(update, context, last_response=solution_message)
         else:
@@ -157,16 +188,16 @@ class MathGame:
                 raise e
 
     async def handle_guess(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        self.last_update = update
         player_guess = update.message.text.strip()
         
-        # First check if it's the solution command
-        if player_guess.lower() == "$solution":
-            await self.show_solution(update, context)
-            return
-            
-        # Process as math solution
-        response = await self.check_guess(player_guess, context)
+        with handling(self, update):
+            # First check if it's the solution command
+            if player_guess.lower() == "$solution":
+                await self.show_solution(update, context)
+                return
+
+            # Process as math solution
+            response = await self.check_guess(player_guess, context)
         if response is not None:
             # Send response without Markdown parsing to avoid entity errors
             await self._send_message(update, response, parse_markdown=False)
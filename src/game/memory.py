@@ -5,18 +5,66 @@ import asyncio
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+# Clicks that land within this many seconds of each other are drawn in a single edit.
+CLICK_RENDER_DELAY = 0.3
+
+PATTERN_RED = InlineKeyboardButton("🔴", callback_data="ignore")
+PATTERN_WHITE = InlineKeyboardButton("⚪", callback_data="ignore")
+
+
+class GridTemplate:
+    """Prebuilt buttons for one grid size, shared by every game.
+
+    Cell ``i`` is row ``i // size``, column ``i % size``; game state stores cells as bits
+    of an int in the same order.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        cells = [f"{cell // size},{cell % size}" for cell in range(size * size)]
+        self.blank = [InlineKeyboardButton("⬜", callback_data=data) for data in cells]
+        self.hit = [InlineKeyboardButton("🟢", callback_data=data) for data in cells]
+        self.miss = [InlineKeyboardButton("🔴", callback_data=data) for data in cells]
+        self.blank_rows = tuple(tuple(self.blank[row * size:(row + 1) * size]) for row in range(size))
+
+    def pattern_rows(self, mask):
+        size = self.size
+        return tuple(
+            tuple(PATTERN_RED if mask >> (row * size + col) & 1 else PATTERN_WHITE for col in range(size))
+            for row in range(size)
+        )
+
+
+_templates = {}
+
+
+def get_template(size):
+    template = _templates.get(size)
+    if template is None:
+        template = _templates[size] = GridTemplate(size)
+    return template
+
+
 class MemoryGame:
+    __slots__ = (
+        "grid_size", "red_mask", "click_mask", "rows", "game_over", "name", "stage", "display_time",
+        "rounds_completed", "rounds_per_size", "hide_task", "render_task", "render_query",
+    )
+
     def __init__(self):
         self.grid_size = 2
-        self.red_squares = set()
-        self.user_clicks = set()
+        self.red_mask = 0
+        self.click_mask = 0
+        self.rows = []
         self.game_over = False
         self.name = "Memory Game"
-        self.current_message = None
         self.stage = 1
         self.display_time = 3
         self.rounds_completed = 0
         self.rounds_per_size = 2
+        self.hide_task = None
+        self.render_task = None
+        self.render_query = None
         
     async def start_game(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         self.grid_size = 2
@@ -33,35 +81,46 @@ class MemoryGame:
         max_red = max(min_red + 1, int(total_squares * 0.3))
         num_red = random.randint(min_red, max_red)
         
-        self.red_squares = set()
-        while len(self.red_squares) < num_red:
-            row = random.randint(0, self.grid_size - 1)
-            col = random.randint(0, self.grid_size - 1)
-            self.red_squares.add((row, col))
-        
-        self.user_clicks = set()
-        
+        self.red_mask = 0
+        for cell in random.sample(range(total_squares), num_red):
+            self.red_mask |= 1 << cell
+        self.click_mask = 0
+        self.rows = []
+
+        # A click render still pending from the last round must not overwrite the new pattern.
+        self.cancel_timers()
         await self._show_pattern(update, context)
-        
-        await asyncio.sleep(self.display_time)
+
+        # Hide the pattern from a background task so this handler returns straight away.
+        self.hide_task = context.application.create_task(
+            self._hide_pattern_later(update, context, self.display_time), update=update
+        )
+
+    async def _hide_pattern_later(self, update: Update, context: ContextTypes.DEFAULT_TYPE, delay):
+        await asyncio.sleep(delay)
+        self.hide_task = None
         await self._show_blank_grid(update, context)
+
+    async def _render_clicks_later(self, delay):
+        await asyncio.sleep(delay)
+        self.render_task = None
+        query, self.render_query = self.render_query, None
+        await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(self.rows))
+
+    def cancel_timers(self):
+        if self.hide_task is not None:
+            self.hide_task.cancel()
+            self.hide_task = None
+        if self.render_task is not None:
+            self.render_task.cancel()
+            self.render_task = None
+        self.render_query = None
     
     async def _show_pattern(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        keyboard = []
-        for row in range(self.grid_size):
-            keyboard_row = []
-            for col in range(self.grid_size):
-                if (row, col) in self.red_squares:
-                    text = "🔴"
-                else:
-                    text = "⚪"
-                keyboard_row.append(InlineKeyboardButton(text, callback_data="ignore"))
-            keyboard.append(keyboard_row)
-            
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = InlineKeyboardMarkup(get_template(self.grid_size).pattern_rows(self.red_mask))
         text = (f"🔍 *Memory Game - Stage {self.stage}*\n\n"
                f"Round {self.rounds_completed + 1}/{self.rounds_per_size} at {self.grid_size}x{self.grid_size}\n"
-               f"Find {len(self.red_squares)} red squares!\n"
+               f"Find {self.red_mask.bit_count()} red squares!\n"
                "Memorize the pattern!")
         
         if update.callback_query:
@@ -71,21 +130,15 @@ class MemoryGame:
                 parse_mode="Markdown"
             )
         else:
-            self.current_message = await update.message.reply_text(
+            await update.message.reply_text(
                 text=text,
                 reply_markup=reply_markup,
                 parse_mode="Markdown"
             )
     
     async def _show_blank_grid(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        keyboard = []
-        for row in range(self.grid_size):
-            keyboard_row = []
-            for col in range(self.grid_size):
-                keyboard_row.append(InlineKeyboardButton("⬜", callback_data=f"{row},{col}"))
-            keyboard.append(keyboard_row)
-            
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        self.rows = list(get_template(self.grid_size).blank_rows)
+        reply_markup = InlineKeyboardMarkup(self.rows)
         text = (f"🔍 *Memory Game - Stage {self.stage}*\n\n"
                f"Round {self.rounds_completed + 1}/{self.rounds_per_size} at {self.grid_size}x{self.grid_size}\n"
                "Click the squares that were red!")
@@ -97,7 +150,7 @@ class MemoryGame:
                 parse_mode="Markdown"
             )
         else:
-            self.current_message = await update.message.reply_text(
+            await update.message.reply_text(
                 text=text,
                 reply_markup=reply_markup,
                 parse_mode="Markdown"
@@ -112,39 +165,29 @@ class MemoryGame:
         
         try:
             row, col = map(int, query.data.split(","))
-        except:
+        except ValueError:
+            return
+        # Only the current round's blank grid is clickable; drop stale clicks from older grids.
+        if not (0 <= row < len(self.rows) and 0 <= col < self.grid_size):
             return
         
-        if (row, col) in self.user_clicks:
+        cell = row * self.grid_size + col
+        bit = 1 << cell
+        if self.click_mask & bit:
             return
         
-        self.user_clicks.add((row, col))
+        self.click_mask |= bit
         
-        keyboard = []
-        for r in range(self.grid_size):
-            keyboard_row = []
-            for c in range(self.grid_size):
-                if (r, c) in self.user_clicks:
-                    if (r, c) in self.red_squares:
-                        text = "🟢"
-                    else:
-                        text = "🔴"
-                else:
-                    text = "⬜"
-                keyboard_row.append(InlineKeyboardButton(text, callback_data=f"{r},{c}"))
-            keyboard.append(keyboard_row)
-            
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_reply_markup(reply_markup=reply_markup)
+        # Patch just the clicked cell's row with a shared template button.
+        template = get_template(self.grid_size)
+        cells = list(self.rows[row])
+        cells[col] = template.hit[cell] if self.red_mask & bit else template.miss[cell]
+        self.rows[row] = tuple(cells)
         
-        correct = sum(1 for square in self.user_clicks if square in self.red_squares)
-        incorrect = sum(1 for square in self.user_clicks if square not in self.red_squares)
-        remaining = len(self.red_squares) - correct
-        
-        if incorrect > 0:
+        if not self.red_mask & bit:
             self.game_over = True
             await self._end_game(update, context, success=False)
-        elif remaining == 0:
+        elif self.click_mask == self.red_mask:
             self.rounds_completed += 1
             
             if self.rounds_completed < self.rounds_per_size:
@@ -160,8 +203,16 @@ class MemoryGame:
                 else:
                     self.game_over = True
                     await self._end_game(update, context, success=True)
+        else:
+            # Show the click with the next batched edit instead of one edit per click.
+            self.render_query = query
+            if self.render_task is None:
+                self.render_task = context.application.create_task(
+                    self._render_clicks_later(CLICK_RENDER_DELAY), update=update
+                )
     
     async def _end_game(self, update: Update, context: ContextTypes.DEFAULT_TYPE, success: bool):
+        self.cancel_timers()
         context.user_data["current_game"] = None
         
         if success:
@@ -171,18 +222,7 @@ class MemoryGame:
                 "Type /play to start a new game."
             )
         else:
-            keyboard = []
-            for row in range(self.grid_size):
-                keyboard_row = []
-                for col in range(self.grid_size):
-                    if (row, col) in self.red_squares:
-                        text = "🔴"
-                    else:
-                        text = "⚪"
-                    keyboard_row.append(InlineKeyboardButton(text, callback_data="ignore"))
-                keyboard.append(keyboard_row)
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = InlineKeyboardMarkup(get_template(self.grid_size).pattern_rows(self.red_mask))
             text = (
                 "💀 *Game Over!*\n\n"
                 "You clicked a wrong square.\n"
@@ -1,28 +1,90 @@
 import random
+import threading
 from telegram import Update
 from telegram.ext import ContextTypes
+from .game import handling
+
+MIN_WORD_LENGTH = 5
+SCRAMBLE_ATTEMPTS = 20
+
+def anagram_key(word):
+    return "".join(sorted(word))
+
+class AnagramIndex:
+    """Read-only anagram groups and playable words, built once per lexicon and shared.
+
+    ``anagrams`` maps sorted letters to every word spelled with them; ``by_length``
+    buckets the playable words (long enough, not a single repeated letter) by length.
+    """
+    def __init__(self, words):
+        anagrams = {}
+        by_length = {}
+        for word in words:
+            anagrams.setdefault(anagram_key(word), []).append(word)
+            if len(word) >= MIN_WORD_LENGTH and len(set(word)) > 1:
+                by_length.setdefault(len(word), []).append(word)
+
+        self.anagrams = {key: tuple(group) for key, group in anagrams.items()}
+        self.by_length = {length: tuple(bucket) for length, bucket in sorted(by_length.items())}
+        self.pool = tuple(word for bucket in self.by_length.values() for word in bucket)
+
+    def is_word(self, word):
+        return word in self.anagrams.get(anagram_key(word), ())
+
+    def are_anagrams(self, word, other):
+        return anagram_key(word) == anagram_key(other) and self.is_word(other)
+
+_anagram_indexes = {}
+_anagram_lock = threading.Lock()
+
+def get_anagram_index(words):
+    index = _anagram_indexes.get(words.name)
+    if index is None:
+        with _anagram_lock:
+            index = _anagram_indexes.get(words.name)
+            if index is None:
+                index = _anagram_indexes[words.name] = AnagramIndex(words)
+    return index
 
 class UnscrambleGame:
+    __slots__ = ("words", "index", "current_word", "scrambled_word", "game_over", "name", "last_update")
+
     def __init__(self, words):
-        self.words = set(words)
+        self.words = words
+        self.index = get_anagram_index(words)
         self.current_word = ""
         self.scrambled_word = ""
         self.game_over = False
         self.name = "Unscramble Word"
         self.last_update = None
         
+    def to_record(self):
+        return {"word": self.current_word, "scrambled": self.scrambled_word}
+
+    @classmethod
+    def from_record(cls, record, words):
+        game = cls(words)
+        game.current_word = record["word"]
+        game.scrambled_word = record["scrambled"]
+        return game
+
     async def start_game(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        self.last_update = update 
-        await self.new_round(update, context)
+        with handling(self, update):
+            await self.new_round(update, context)
         
-    async def new_round(self, update: Update, context: ContextTypes.DEFAULT_TYPE, last_response: str = None):
-        while True:
-            self.current_word = random.choice(list(self.words)).lower()
+    def pick_word(self):
+        """Return a random playable word and a scramble of it."""
+        word = random.choice(self.index.pool)
 
-            if len(self.current_word) >= 5:
+        # Re-shuffle scrambles that spell a real word, which would give the answer away.
+        for _ in range(SCRAMBLE_ATTEMPTS):
+            scrambled = "".join(random.sample(word, len(word)))
+            if not self.index.is_word(scrambled):
                 break
-        
-        self.scrambled_word = "".join(random.sample(self.current_word, len(self.current_word)))
+        return word, scrambled
+
+    async def new_round(self, update: Update, context: ContextTypes.DEFAULT_TYPE, last_response: str = None):
+        self.current_word, self.scrambled_word = self.pick_word()
         self.game_over = False
         context.user_data["current_game"] = self
         
@@ -33,7 +95,7 @@ class UnscrambleGame:
         )
         
         if last_response:
-            await self._send_message(update, last_response)
+            start_message = f"{last_response}\n\n{start_message}"
 
         await self._send_message(update, start_message)
 
@@ -45,12 +107,14 @@ class UnscrambleGame:
 
     async def check_guess(self, player_guess: str, context: ContextTypes.DEFAULT_TYPE):
         player_guess = player_guess.lower().strip()
-        print(self.current_word)
         if not player_guess:
             return "Please enter a word or type /stop to end the game."
 
-        if player_guess == self.current_word:
-            response = f"✅ *Correct!* The word was \"{self.current_word}\"."
+        if player_guess == self.current_word or self.index.are_anagrams(self.current_word, player_guess):
+            if player_guess == self.current_word:
+                response = f"✅ *Correct!* The word was \"{self.current_word}\"."
+            else:
+                response = f"✅ *Correct!* \"{player_guess}\" works too (I was thinking of \"{self.current_word}\")."
             if self.last_update:
                 await self.new_round(self.last_update, context, last_response=response)
                 return
@@ -58,9 +122,9 @@ class UnscrambleGame:
         return "❌ That's not correct. Try again or type /stop to end the game."
 
     async def handle_guess(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        self.last_update = update
         player_guess = update.message.text.strip().lower()
-        response = await self.check_guess(player_guess, context)
+        with handling(self, update):
+            response = await self.check_guess(player_guess, context)
         if response is None:
             return
         await self._send_message(update, response)
@@ -1,22 +1,98 @@
 import random
+import threading
+from array import array
 
-class WordChainGame:
+LETTERS = 26
+DIFFICULTIES = ("easy", "medium", "hard")
+
+def letter_index(letter):
+    return ord(letter) - ord("a")
+
+class TransitionIndex:
+    """Read-only 26x26 table of how many lexicon words start with one letter and end with another.
+
+    Also keeps the lexicon indexes for every (first, last) pair so a strategic bot can
+    draw a word for a chosen pair without scanning, and how many words start with each
+    letter. Built once per lexicon and shared.
+    """
     def __init__(self, words):
-        self.words = set(words)
-        self.current_word = random.choice(list(self.words))
+        buckets = [array("I") for _ in range(LETTERS * LETTERS)]
+        for index, word in enumerate(words):
+            buckets[letter_index(word[0]) * LETTERS + letter_index(word[-1])].append(index)
+        self.buckets = buckets
+        self.counts = array("I", (len(bucket) for bucket in buckets))
+        self.starters = array("I", (sum(self.counts[first * LETTERS:(first + 1) * LETTERS]) for first in range(LETTERS)))
+
+_transition_indexes = {}
+_transition_lock = threading.Lock()
+
+def get_transition_index(words):
+    index = _transition_indexes.get(words.name)
+    if index is None:
+        with _transition_lock:
+            index = _transition_indexes.get(words.name)
+            if index is None:
+                index = _transition_indexes[words.name] = TransitionIndex(words)
+    return index
+
+class WordPool:
+    """Random draws without replacement from a shared, read-only bucket of word indexes.
+
+    Uses a sparse Fisher-Yates shuffle: only the swapped slots are stored, so the
+    bucket itself is never copied and each draw is O(1) however long the game runs.
+    """
+    __slots__ = ("bucket", "remaining", "swaps")
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.remaining = len(bucket)
+        self.swaps = {}
+
+    def draw(self):
+        if self.remaining == 0:
+            return None
+        slot = random.randrange(self.remaining)
+        last = self.remaining - 1
+        value = self.swaps.get(slot, slot)
+        if slot != last:
+            self.swaps[slot] = self.swaps.get(last, last)
+        self.swaps.pop(last, None)
+        self.remaining = last
+        return self.bucket[value]
+
+class WordChainGame:
+    """One player's word chain.
+
+    Used words are kept as lexicon indexes, and the strategic bot's view of what is left
+    as per-game decrements against the shared ``TransitionIndex`` counts, so a game only
+    stores what it has changed.
+    """
+    __slots__ = ("words", "difficulty", "current_word", "game_over", "name", "used", "pools", "transitions", "pair_uses", "starter_uses")
+
+    def __init__(self, words, difficulty="easy"):
+        self.words = words
+        self.difficulty = difficulty
+        self.current_word = random.choice(self.words)
         self.game_over = False
         self.name = "WordChain"
-        self.used_words = set() 
-        self.used_words.add(self.current_word)
+        self.used = set()
+        self.pools = {}
+        self.transitions = None
+        self.pair_uses = None
+        self.starter_uses = None
+        self._use_word(self.current_word)
 
     async def start_game(self, update, context):
         self.game_over = False
-        self.current_word = random.choice(list(self.words))
-        self.used_words = {self.current_word}
+        self.current_word = random.choice(self.words)
+        self.used = set()
+        self.pools = {}
+        self._reset_counts()
+        self._use_word(self.current_word)
         context.user_data["current_game"] = self
         
         start_message = (
-            f"🌟 Word Chain Game Started! 🌟\n"
+            f"🌟 Word Chain Game Started! ({self.difficulty.capitalize()}) 🌟\n"
             f"My first word is: {self.current_word}\n"
             f"Your turn! Reply with a word starting with \"{self.current_word[-1]}\""
         )
@@ -27,14 +103,83 @@ class WordChainGame:
             await update.callback_query.message.reply_text(start_message)
         return start_message
 
+    def to_record(self):
+        return {"difficulty": self.difficulty, "current": self.current_word, "used": sorted(self.words[index] for index in self.used)}
+
+    @classmethod
+    def from_record(cls, record, words):
+        game = cls(words, record["difficulty"])
+        game.current_word = record["current"]
+        game.used = set()
+        game._reset_counts()
+        for word in record["used"]:
+            game._use_word(word)
+        return game
+
+    def _reset_counts(self):
+        if self.difficulty == "easy":
+            self.transitions = None
+            self.pair_uses = None
+            self.starter_uses = None
+        else:
+            self.transitions = get_transition_index(self.words)
+            self.pair_uses = {}
+            self.starter_uses = {}
+
+    def _use_word(self, word, index=None):
+        self.used.add(self.words.index(word) if index is None else index)
+        if self.transitions is not None:
+            first = letter_index(word[0])
+            key = first * LETTERS + letter_index(word[-1])
+            self.pair_uses[key] = self.pair_uses.get(key, 0) + 1
+            self.starter_uses[first] = self.starter_uses.get(first, 0) + 1
+
+    def _pairs_left(self, key):
+        return self.transitions.counts[key] - self.pair_uses.get(key, 0)
+
+    def _starters_left(self, first):
+        return self.transitions.starters[first] - self.starter_uses.get(first, 0)
+
+    def _draw(self, key, bucket):
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = WordPool(bucket)
+
+        # Words the player already used are still in the pool; they are dropped when drawn.
+        while True:
+            index = pool.draw()
+            if index is None:
+                return None
+            if index not in self.used:
+                return self.words[index]
+
+    def _choose_last_letter(self, first):
+        """Pick the ending letter for the bot's word, favouring letters with few starters left."""
+        row = [self._pairs_left(first * LETTERS + last) for last in range(LETTERS)]
+        options = [last for last in range(LETTERS) if row[last]]
+        if not options:
+            return None
+
+        starters = {last: self._starters_left(last) for last in options}
+        if self.difficulty == "hard":
+            fewest = min(starters.values())
+            return random.choice([last for last in options if starters[last] == fewest])
+
+        weights = [row[last] / (1 + starters[last]) for last in options]
+        return random.choices(options, weights=weights)[0]
+
     def find_bot_word(self, last_letter):
         """Find a valid word starting with the given letter that hasn't been used yet"""
-        possible_words = [
-            word for word in self.words 
-            if word.startswith(last_letter) 
-            and word not in self.used_words
-        ]
-        return random.choice(possible_words) if possible_words else None
+        if self.transitions is not None:
+            first = letter_index(last_letter)
+            last = self._choose_last_letter(first)
+            if last is not None:
+                key = first * LETTERS + last
+                word = self._draw(key, self.transitions.buckets[key])
+                if word is not None:
+                    return word
+
+        return self._draw(last_letter, range(*self.words.prefix_range(last_letter)))
 
     async def check_word(self, player_word, context):
         player_word = player_word.lower().strip()
@@ -49,17 +194,18 @@ class WordChainGame:
             context.user_data["current_game"] = None
             return f"❌ Your word \"{player_word}\" doesn't start with \"{self.current_word[-1]}\". Game over!"
 
-        if player_word not in self.words:
+        index = self.words.index(player_word)
+        if index < 0:
             self.game_over = True
             context.user_data["current_game"] = None
             return f"❌ \"{player_word}\" is not in the dictionary. Game over!"
 
-        if player_word in self.used_words:
+        if index in self.used:
             self.game_over = True
             context.user_data["current_game"] = None
             return f"❌ \"{player_word}\" was already used. Game over!"
 
-        self.used_words.add(player_word)
+        self._use_word(player_word, index)
         self.current_word = player_word
         
         bot_word = self.find_bot_word(player_word[-1])
@@ -71,7 +217,7 @@ class WordChainGame:
                 f"🏆 I can't think of a word starting with \"{player_word[-1]}\"! You win!"
             )
         
-        self.used_words.add(bot_word)
+        self._use_word(bot_word)
         self.current_word = bot_word
         
         return (
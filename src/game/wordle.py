@@ -1,36 +1,73 @@
+import asyncio
 import random
 from .game import Game
-import json
+from .lexicon import get_lexicon
+from .wordle_solver import Constraints, get_answer_index, pattern_code, suggest_guess
+
+SQUARES = ("🟥", "🟨", "🟩")
+# Rendered feedback for every base-3 pattern code, indexed by code.
+FEEDBACK_TEXT = tuple(
+    " ".join(SQUARES[code // 3 ** i % 3] for i in range(5))
+    for code in range(3 ** 5)
+)
 
 def load_word_list():
-    with open("word-list.json", "r") as file:
-        return json.load(file)
+    return get_lexicon("word-list.json")
 
 def load_valid_words():
-    with open("valid-words.json", "r") as file:
-        return json.load(file)
+    return get_lexicon("valid-words.json")
 
 class WordleGame(Game):
-    def __init__(self):
+    __slots__ = ("hard_mode", "constraints", "target_word", "attempts", "guesses")
+
+    def __init__(self, hard_mode=False):
         super().__init__("Wordle")
+        self.hard_mode = hard_mode
+        self.constraints = None
         self.target_word = random.choice(load_word_list()).lower()
         self.attempts = 6
-        self.valid_words = load_valid_words()
+        self.guesses = []
+
+    @property
+    def valid_words(self):
+        return load_valid_words()
     
+    def to_record(self):
+        return {"target": self.target_word, "attempts": self.attempts, "guesses": self.guesses, "hard": self.hard_mode}
+
+    @classmethod
+    def from_record(cls, record):
+        game = cls(hard_mode=record["hard"])
+        game.target_word = record["target"]
+        game.attempts = record["attempts"]
+        game.guesses = list(record["guesses"])
+        if game.hard_mode:
+            # Replaying the guesses rebuilds the hard-mode constraints.
+            game.constraints = Constraints(get_answer_index())
+            for guess in game.guesses:
+                game.constraints.update(guess, pattern_code(guess, game.target_word))
+        return game
+
     async def start_game(self, update, context):
         self.attempts = 6
         self.target_word = random.choice(load_word_list()).lower()
+        self.guesses = []
+        self.constraints = Constraints(get_answer_index()) if self.hard_mode else None
 
         context.user_data["current_game"] = self
 
         if hasattr(update, "callback_query"):
-            await update.callback_query.message.reply_text("New Wordle game started! Guess a 5-letter word:")
+            await update.callback_query.message.reply_text("New Wordle game started! Guess a 5-letter word (or type $hint):")
         else:
-            await update.message.reply_text("New Wordle game started! Guess a 5-letter word:")
+            await update.message.reply_text("New Wordle game started! Guess a 5-letter word (or type $hint):")
 
     async def handle_guess(self, update, context):
         guessed_word = update.message.text.strip().lower()
 
+        if guessed_word == "$hint":
+            await update.message.reply_text(await self.get_hint())
+            return
+
         if len(guessed_word) != 5:
             await update.message.reply_text("Your guess must be a 5-letter word.")
             return
@@ -39,37 +76,38 @@ class WordleGame(Game):
             await update.message.reply_text("This is not a valid word. Please guess a valid 5-letter word.")
             return
 
+        if self.constraints is not None:
+            violation = self.constraints.violation(guessed_word)
+            if violation:
+                await update.message.reply_text(f"Hard mode: {violation}")
+                return
+
         if guessed_word == self.target_word:
             await update.message.reply_text(f"Congrats! You guessed the word: {self.target_word}. You win!")
             context.user_data["current_game"] = None
             return
         
         feedback = self.get_feedback(guessed_word)
+        self.guesses.append(guessed_word)
         self.attempts -= 1
         if self.attempts == 0:
             await update.message.reply_text(f"Game over! The word was: {self.target_word}. Better luck next time!")
             context.user_data["current_game"] = None
             return
         
+        if self.constraints is not None:
+            self.constraints.update(guessed_word, pattern_code(guessed_word, self.target_word))
+            feedback += f"\n{self.constraints.remaining()} possible answers left."
+
         await update.message.reply_text(feedback)
 
+    async def get_hint(self):
+        history = tuple((guess, pattern_code(guess, self.target_word)) for guess in self.guesses)
+        # Building the matrix or guess index on first use, or ranking a new history, would hold
+        # the event loop. The user's next update waits for this one, so constraints stay put.
+        guess, remaining = await asyncio.to_thread(suggest_guess, history, self.constraints)
+        return f"💡 Hint: try \"{guess}\". {remaining} possible answers remain."
+
     def get_feedback(self, guessed_word):
-        feedback = [""] * 5
-        target_word_copy = list(self.target_word)
-        
-        for i, char in enumerate(guessed_word):
-            if char == self.target_word[i]:
-                feedback[i] = "🟩"
-                target_word_copy[i] = None
-        
-        for i, char in enumerate(guessed_word):
-            if feedback[i] == "":
-                if char in target_word_copy and char != None:
-                    feedback[i] = "🟨"
-                    target_word_copy[target_word_copy.index(char)] = None
-        
-        for i, char in enumerate(guessed_word):
-            if feedback[i] == "":
-                feedback[i] = "🟥"
-        
-        return " ".join(feedback) + f" [{self.attempts-1} attempts left]"
+        feedback = FEEDBACK_TEXT[pattern_code(guessed_word, self.target_word)]
+        return feedback + f" [{self.attempts-1} attempts left]"
\ No newline at end of file
@@ -0,0 +1,304 @@
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+from .artifact import ArtifactFormat, Shared
+from .lexicon import get_lexicon
+
+logger = logging.getLogger(__name__)
+
+GUESSES_FILE = "valid-words.json"
+ANSWERS_FILE = "word-list.json"
+MATRIX_FILE = "wordle-patterns.bin"
+
+# Pattern matrix layout: header (magic, version, guess count, answer count), then one
+# uint8 pattern code per (guess, answer) pair, row-major by guess.
+FORMAT = ArtifactFormat(b"GBWP", 1, "II", "Wordle pattern matrix")
+
+ALL_GREEN = 242
+WEIGHTS = (1, 3, 9, 27, 81)
+# Hints kept per process, by guess history; each is a guess and a count.
+HINT_CACHE_SIZE = 4096
+
+
+def pattern_code(guess, answer):
+    """Encode Wordle feedback as a base-3 number: 0 absent, 1 present, 2 correct, per position.
+
+    Both words must be lowercase a-z. Unmatched answer letters are tracked in a fixed
+    26-slot count array, so repeated letters need no searching or sentinel values.
+    """
+    counts = [0] * 26
+    for g, a in zip(guess, answer):
+        if g != a:
+            counts[ord(a) - 97] += 1
+
+    code = 0
+    for g, a, weight in zip(guess, answer, WEIGHTS):
+        if g == a:
+            code += 2 * weight
+        else:
+            letter = ord(g) - 97
+            if counts[letter]:
+                counts[letter] -= 1
+                code += weight
+    return code
+
+
+def _pattern_rows(guesses, answers):
+    rows = []
+    for guess in guesses:
+        letters = set(guess)
+        rows.append(bytes(
+            pattern_code(guess, answer) if not letters.isdisjoint(answer) else 0
+            for answer in answers
+        ))
+    return b"".join(rows)
+
+
+def build_pattern_matrix(path=MATRIX_FILE, workers=None):
+    """Compute the pattern code of every guess against every answer and write it to ``path``."""
+    guesses = list(get_lexicon(GUESSES_FILE))
+    answers = list(get_lexicon(ANSWERS_FILE))
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if workers > 1:
+        chunk = -(-len(guesses) // workers)
+        chunks = [guesses[i:i + chunk] for i in range(0, len(guesses), chunk)]
+        with ProcessPoolExecutor(workers) as executor:
+            data = b"".join(executor.map(_pattern_rows, chunks, [answers] * len(chunks)))
+    else:
+        data = _pattern_rows(guesses, answers)
+
+    FORMAT.write(path, (len(guesses), len(answers)), [data])
+    logger.info(
+        "Built Wordle pattern matrix %s (%dx%d) in %.1fs",
+        path, len(guesses), len(answers), time.perf_counter() - start
+    )
+    return path
+
+
+class PatternMatrix:
+    """Memory-mapped guess x answer feedback table used for hints and candidate filtering."""
+
+    def __init__(self, path=MATRIX_FILE):
+        self.guesses = get_lexicon(GUESSES_FILE)
+        self.answers = get_lexicon(ANSWERS_FILE)
+
+        self._mmap, (guess_count, answer_count) = FORMAT.map(path)
+        if guess_count != len(self.guesses) or answer_count != len(self.answers):
+            raise ValueError(f"{path} does not match the current word lists")
+
+        self._data = memoryview(self._mmap)[FORMAT.size:]
+        self._width = answer_count
+        self._hints = OrderedDict()
+        self._hints_lock = threading.Lock()
+
+    def row(self, guess_index):
+        start = guess_index * self._width
+        return self._data[start:start + self._width]
+
+    def code(self, guess, answer):
+        return self.row(self.guesses.index(guess))[self.answers.index(answer)]
+
+    def filter(self, candidates, guess, code):
+        """Return the answer indexes from ``candidates`` (None for all) consistent with ``code``."""
+        row = self.row(self.guesses.index(guess))
+        if candidates is None:
+            candidates = range(self._width)
+        return [answer for answer in candidates if row[answer] == code]
+
+    def _entropy(self, row, candidates):
+        if candidates is None:
+            counts = Counter(row)
+            total = self._width
+        elif len(candidates) == 1:
+            return 0.0
+        else:
+            counts = Counter(itemgetter(*candidates)(row))
+            total = len(candidates)
+        return math.log2(total) - sum(n * math.log2(n) for n in counts.values()) / total
+
+    def best_guess(self, candidates=None, legal=None):
+        """Return the guess with the highest expected information over ``candidates``.
+
+        ``legal`` is a bitset over the guesses limiting which may be suggested (None for all).
+        """
+        if candidates is not None and len(candidates) <= 2:
+            return self.answers[candidates[0]] if candidates else None
+
+        possible = None if candidates is None else {self.answers[i] for i in candidates}
+        guess_indexes = range(len(self.guesses))
+        if legal is not None:
+            guess_indexes = [i for i in guess_indexes if legal >> i & 1]
+        best, best_score = None, -1.0
+        for guess_index in guess_indexes:
+            score = self._entropy(self.row(guess_index), candidates)
+            guess = self.guesses[guess_index]
+            # Prefer a guess that could itself be the answer when the information is equal.
+            if score > best_score or (score == best_score and possible and guess in possible):
+                best, best_score = guess, score
+        return best
+
+    def suggest(self, history, legal=None):
+        """Return the best guess and the number of answers left after ``history``, a tuple of (guess, code).
+
+        In hard mode ``legal`` is the bitset of guesses the player may still make.
+
+        Ranking every guess takes up to half a second while many answers remain, so
+        hints are cached by history: the opening hint and the common second ones come
+        back at once. Uncached hints still take that long; call this off the event loop.
+        """
+        if legal == (1 << len(self.guesses)) - 1:
+            legal = None
+        key = (history, legal)
+        with self._hints_lock:
+            hint = self._hints.get(key)
+            if hint is not None:
+                self._hints.move_to_end(key)
+                return hint
+
+        candidates = None
+        for guess, code in history:
+            candidates = self.filter(candidates, guess, code)
+        hint = (self.best_guess(candidates, legal), len(self.answers) if candidates is None else len(candidates))
+
+        with self._hints_lock:
+            self._hints[key] = hint
+            if len(self._hints) > HINT_CACHE_SIZE:
+                self._hints.popitem(last=False)
+        return hint
+
+
+class AnswerIndex:
+    """Letter-position bitsets over a word list, normally the answers; bit ``i`` stands for word ``i``.
+
+    ``positions[pos][letter]`` holds the answers with ``letter`` at ``pos``, and
+    ``at_least[letter][n]`` the answers containing ``letter`` at least ``n`` times.
+    """
+
+    def __init__(self, answers):
+        self.positions = [[0] * 26 for _ in range(5)]
+        self.at_least = [[0] * 7 for _ in range(26)]
+        for index, answer in enumerate(answers):
+            bit = 1 << index
+            counts = [0] * 26
+            for pos, char in enumerate(answer):
+                letter = ord(char) - 97
+                self.positions[pos][letter] |= bit
+                counts[letter] += 1
+            for letter, count in enumerate(counts):
+                for n in range(count + 1):
+                    self.at_least[letter][n] |= bit
+        self.all = (1 << len(answers)) - 1
+
+
+class Constraints:
+    """What the feedback so far has revealed about the answer, updated one guess at a time.
+
+    Each position keeps a 26-bit mask of letters it may still hold, and each letter a
+    minimum and maximum count. Candidates come from intersecting ``AnswerIndex`` bitsets.
+    Kept per game, so the state is packed: ``greens`` holds the confirmed letter of each
+    position as an ASCII code (0 while unknown) and the counts are bytearrays.
+    """
+
+    __slots__ = ("index", "allowed", "greens", "min_counts", "max_counts", "candidates")
+
+    def __init__(self, index):
+        self.index = index
+        self.allowed = array("I", [(1 << 26) - 1] * 5)
+        self.greens = bytearray(5)
+        self.min_counts = bytearray(26)
+        self.max_counts = bytearray([5] * 26)
+        self.candidates = index.all
+
+    def update(self, guess, code):
+        marked = [0] * 26
+        absent = [False] * 26
+        for pos, char in enumerate(guess):
+            letter = ord(char) - 97
+            digit = code // WEIGHTS[pos] % 3
+            if digit == 2:
+                self.allowed[pos] = 1 << letter
+                self.greens[pos] = letter + 97
+                marked[letter] += 1
+            else:
+                self.allowed[pos] &= ~(1 << letter)
+                if digit == 1:
+                    marked[letter] += 1
+                else:
+                    absent[letter] = True
+
+        for letter in set(ord(char) - 97 for char in guess):
+            self.min_counts[letter] = max(self.min_counts[letter], marked[letter])
+            if absent[letter]:
+                self.max_counts[letter] = marked[letter]
+
+        candidates = self.index.all
+        for pos, mask in enumerate(self.allowed):
+            matching = 0
+            for letter in range(26):
+                if mask >> letter & 1:
+                    matching |= self.index.positions[pos][letter]
+            candidates &= matching
+        for letter in range(26):
+            if self.min_counts[letter]:
+                candidates &= self.index.at_least[letter][self.min_counts[letter]]
+            if self.max_counts[letter] < 5:
+                candidates &= ~self.index.at_least[letter][self.max_counts[letter] + 1]
+        self.candidates = candidates
+
+    def remaining(self):
+        return self.candidates.bit_count()
+
+    def legal(self, guesses):
+        """Return the bitset of words in ``guesses`` (an ``AnswerIndex``) for which ``violation`` is None."""
+        legal = guesses.all
+        for pos, code in enumerate(self.greens):
+            if code:
+                legal &= guesses.positions[pos][code - 97]
+        for letter, minimum in enumerate(self.min_counts):
+            if minimum:
+                legal &= guesses.at_least[letter][minimum]
+        return legal
+
+    def violation(self, guess):
+        """Return why ``guess`` ignores a revealed hint (hard mode), or None if it uses them all."""
+        for pos, code in enumerate(self.greens):
+            if code and ord(guess[pos]) != code:
+                return f"Letter {pos + 1} must be \"{chr(code)}\"."
+        for letter, minimum in enumerate(self.min_counts):
+            char = chr(letter + 97)
+            if guess.count(char) < minimum:
+                return f"Your guess must contain \"{char}\"" + (f" {minimum} times." if minimum > 1 else ".")
+        return None
+
+
+def _open_matrix():
+    counts = (len(get_lexicon(GUESSES_FILE)), len(get_lexicon(ANSWERS_FILE)))
+    if FORMAT.is_stale(MATRIX_FILE, counts, (GUESSES_FILE, ANSWERS_FILE)):
+        build_pattern_matrix(MATRIX_FILE)
+    matrix = PatternMatrix(MATRIX_FILE)
+    matrix.suggest(())
+    return matrix
+
+
+get_pattern_matrix = Shared(_open_matrix).get
+get_answer_index = Shared(lambda: AnswerIndex(get_lexicon(ANSWERS_FILE))).get
+# Letter-position bitsets over the valid guesses, for hard-mode hints.
+get_guess_index = Shared(lambda: AnswerIndex(get_lexicon(GUESSES_FILE))).get
+
+
+def suggest_guess(history, constraints=None):
+    """``PatternMatrix.suggest`` on the shared matrix, which may first have to be built.
+
+    With hard-mode ``constraints``, only guesses that satisfy them are suggested.
+    """
+    legal = constraints.legal(get_guess_index()) if constraints is not None else None
+    return get_pattern_matrix().suggest(history, legal)